@@ -5,6 +5,13 @@ from mixer.backend.django import mixer as _mixer
 from posts.models import Post, Group
 
 
+@pytest.fixture(autouse=True)
+def inline_thumbnails(settings):
+    # Пул миниатюр пишет в MEDIA_ROOT уже после ответа, когда временный
+    # каталог mock_media удаляется; в тестах миниатюры создаются сразу.
+    settings.THUMBNAIL_WORKERS = 0
+
+
 @pytest.fixture()
 def mock_media(settings):
     with tempfile.TemporaryDirectory() as temp_directory:
@@ -0,0 +1,84 @@
+import json
+from contextlib import contextmanager
+from functools import partial
+from itertools import islice
+
+from django.db import models
+
+
+READ_SIZE = 64 * 1024
+SEPARATORS = ' \t\r\n,'
+
+
+def batched(iterable, size):
+    """Разбивает iterable на списки длиной не больше size."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def preserve_auto_dates(*model_classes):
+    """Не даёт bulk_create перезаписать даты полей auto_now/auto_now_add.
+
+    bulk_create, в отличие от save(raw=True), всегда вызывает pre_save
+    полей. Пока действует менеджер, текущее время подставляется только
+    в пустые поля.
+    """
+    patched = []
+    for model in model_classes:
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.DateField) and (
+                field.auto_now or field.auto_now_add
+            ):
+                field.pre_save = partial(_keep_date, field, field.pre_save)
+                patched.append(field)
+    try:
+        yield
+    finally:
+        for field in patched:
+            del field.pre_save
+
+
+def _keep_date(field, pre_save, model_instance, add):
+    value = getattr(model_instance, field.attname)
+    if value is None:
+        return pre_save(model_instance, add)
+    return value
+
+
+def iter_json_array(stream, read_size=READ_SIZE):
+    """Читает элементы JSON-массива из файла по одному.
+
+    В памяти держится только текущий кусок файла, а не весь массив.
+    """
+    decoder = json.JSONDecoder()
+    buffer = stream.read(read_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Ожидался JSON-массив.')
+    position = 1
+
+    while True:
+        position = skip_separators(buffer, position)
+        if buffer[position:position + 1] == ']':
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except ValueError:
+            # Элемент не поместился в буфер: дочитываем файл.
+            chunk = stream.read(read_size)
+            if not chunk:
+                raise
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+
+
+def skip_separators(buffer, position):
+    while position < len(buffer) and buffer[position] in SEPARATORS:
+        position += 1
+    return position
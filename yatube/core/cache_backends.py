@@ -0,0 +1,341 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.dispatch import Signal
+
+from .server_timing import current, measure
+from .tracing import current_trace, span
+
+
+MISSING = object()
+
+# Кэш очищен целиком: кэши в памяти процесса поверх него тоже
+# нужно очистить.
+cache_cleared = Signal()
+
+CHUNK_SIZE = 500
+CULL_BATCH = 100
+MAX_INTEGER = 2 ** 63 - 1
+
+SCHEMA = '''
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS cache_size (total INTEGER NOT NULL);
+INSERT INTO cache_size SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM cache_size);
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_size SET total = total + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_size SET total = total - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache
+BEGIN
+    UPDATE cache_size SET total = total - old.size + new.size;
+END;
+COMMIT;
+'''
+
+
+def is_measured():
+    return current() is not None or current_trace() is not None
+
+
+@contextmanager
+def instrument(operation):
+    with span('cache', operation=operation), measure('cache') as timings:
+        yield timings
+
+
+def timed(name):
+    def method(self, *args, **kwargs):
+        call = getattr(super(InstrumentedCacheMixin, self), name)
+        if not is_measured():
+            return call(*args, **kwargs)
+        with instrument(name):
+            return call(*args, **kwargs)
+    method.__name__ = name
+    return method
+
+
+class InstrumentedCacheMixin:
+    """Учитывает время обращений к кэшу, попадания и промахи в
+    Server-Timing и трассе текущего запроса. Вне замеряемого запроса
+    методы сразу вызывают бэкенд."""
+
+    def get(self, key, default=None, version=None):
+        if not is_measured():
+            return super().get(key, default, version=version)
+        with instrument('get') as timings:
+            value = super().get(key, MISSING, version=version)
+            if timings is not None:
+                timings.counts[
+                    'cache_misses' if value is MISSING else 'cache_hits'
+                ] += 1
+        return default if value is MISSING else value
+
+    def get_many(self, keys, version=None):
+        if not is_measured():
+            return super().get_many(keys, version=version)
+        keys = list(keys)
+        with instrument('get_many') as timings:
+            found = super().get_many(keys, version=version)
+            if timings is not None:
+                timings.counts['cache_hits'] += len(found)
+                timings.counts['cache_misses'] += len(keys) - len(found)
+        return found
+
+    set = timed('set')
+    add = timed('add')
+    set_many = timed('set_many')
+    incr = timed('incr')
+    delete = timed('delete')
+    delete_many = timed('delete_many')
+
+    def clear(self):
+        super().clear()
+        cache_cleared.send(sender=self.__class__, cache=self)
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+def chunks(items, size=CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def encode(value):
+    # Целые числа хранятся как INTEGER, чтобы incr работал в SQL.
+    if type(value) is int and -MAX_INTEGER <= value <= MAX_INTEGER:
+        return value
+    return sqlite3.Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def decode(value):
+    return value if isinstance(value, int) else pickle.loads(value)
+
+
+def get_size(key, value):
+    return len(key) + (8 if isinstance(value, int) else len(value))
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite в режиме WAL, общий для всех процессов
+    на одном сервере.
+
+    LOCATION -- путь к файлу. OPTIONS['MAX_SIZE'] -- бюджет в байтах
+    на ключи и значения: при превышении сначала удаляются истёкшие
+    записи, затем давно не читанные (LRU) до CULL_TARGET бюджета.
+    Время последнего чтения обновляется не чаще ACCESS_RESOLUTION
+    секунд, чтобы чтения не превращались в записи.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.location = location
+        self.max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self.cull_target = float(options.get('CULL_TARGET', 0.9))
+        self.access_resolution = float(
+            options.get('ACCESS_RESOLUTION', 1.0)
+        )
+        self.local = threading.local()
+
+    @property
+    def db(self):
+        # Соединение своё у каждого потока и у каждого процесса после
+        # fork.
+        pid = os.getpid()
+        if getattr(self.local, 'pid', None) != pid:
+            db = sqlite3.connect(
+                self.location, timeout=30, isolation_level=None
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            # Строки, заменённые INSERT OR REPLACE, должны вызывать
+            # триггер удаления, иначе размер кэша разойдётся.
+            db.execute('PRAGMA recursive_triggers=ON')
+            db.executescript(SCHEMA)
+            self.local.db = db
+            self.local.pid = pid
+        return self.local.db
+
+    @contextmanager
+    def transaction(self):
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def read(self, keys):
+        """Живые значения по ключам бэкенда."""
+        now = time.time()
+        found = {}
+        stale = []
+        for chunk in chunks(keys):
+            rows = self.db.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                chunk,
+            )
+            for key, value, expires, accessed in rows:
+                if expires is not None and expires <= now:
+                    continue
+                found[key] = value
+                if now - accessed >= self.access_resolution:
+                    stale.append((now, key))
+        if stale:
+            with self.transaction() as db:
+                db.executemany(
+                    'UPDATE cache SET accessed = ? WHERE key = ?', stale
+                )
+        return found
+
+    def write(self, db, items, timeout, replace=True):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = []
+        for key, value in items:
+            value = encode(value)
+            rows.append((key, value, expires, now, get_size(key, value)))
+        db.executemany(
+            f'INSERT OR {"REPLACE" if replace else "IGNORE"} INTO cache '
+            '(key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?)',
+            rows,
+        )
+
+    def cull(self, db):
+        (total,) = db.execute('SELECT total FROM cache_size').fetchone()
+        if total <= self.max_size:
+            return
+        db.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+        )
+        target = self.max_size * self.cull_target
+        while True:
+            (total,) = db.execute('SELECT total FROM cache_size').fetchone()
+            if total <= target:
+                return
+            cursor = db.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (CULL_BATCH,),
+            )
+            if not cursor.rowcount:
+                return
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        found = self.read([key])
+        return decode(found[key]) if key in found else default
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_key(key, version): key for key in keys}
+        for key in keys:
+            self.validate_key(key)
+        found = self.read(list(keys))
+        return {keys[key]: decode(value) for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = []
+        for key, value in data.items():
+            key = self.make_key(key, version)
+            self.validate_key(key)
+            items.append((key, value))
+        with self.transaction() as db:
+            self.write(db, items, timeout)
+            self.cull(db)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        with self.transaction() as db:
+            db.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time()),
+            )
+            self.write(db, [(key, value)], timeout, replace=False)
+            added = db.execute('SELECT changes()').fetchone()[0] > 0
+            self.cull(db)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        with self.transaction() as db:
+            cursor = db.execute(
+                'UPDATE cache SET expires = ? '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time()),
+            )
+            return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно для всех процессов: чтение и запись идут в одной
+        транзакции BEGIN IMMEDIATE."""
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        with self.transaction() as db:
+            row = db.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[1] is not None and row[1] <= time.time():
+                raise ValueError(f"Key '{key}' not found")
+            value = decode(row[0]) + delta
+            encoded = encode(value)
+            db.execute(
+                'UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                (encoded, get_size(key, encoded), key),
+            )
+        return value
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        return key in self.read([key])
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+        with self.transaction() as db:
+            for chunk in chunks(keys):
+                db.execute(
+                    'DELETE FROM cache '
+                    f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                    chunk,
+                )
+
+    def clear(self):
+        with self.transaction() as db:
+            db.execute('DELETE FROM cache')
+
+
+class InstrumentedSQLiteCache(InstrumentedCacheMixin, SQLiteCache):
+    pass
@@ -0,0 +1,73 @@
+import hashlib
+import math
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+from .tagged_cache import get_tag_stamps
+
+
+def get_user_component(request):
+    if not request.user.is_authenticated:
+        return 'anonymous'
+    return f'{request.user.pk}:{request.session.session_key}'
+
+
+def get_etag(request, stamps):
+    parts = [settings.ETAG_VERSION, get_user_component(request)]
+    parts.extend(f'{tag}={stamps[tag]!r}' for tag in sorted(stamps))
+    digest = hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+    return quote_etag(digest)
+
+
+def resolve_scopes(scopes, request, args, kwargs):
+    if len(scopes) == 1 and callable(scopes[0]):
+        return scopes[0](request, *args, **kwargs)
+    return [scope.format(**kwargs) for scope in scopes]
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        response.setdefault('ETag', etag)
+        if last_modified is not None:
+            response.setdefault('Last-Modified', http_date(last_modified))
+
+
+def conditional_page(*scopes):
+    """Отвечает 304, если данные страницы не менялись, не вызывая view.
+
+    scopes -- шаблоны тегов, которые форматируются аргументами view,
+    или одна функция (request, *args, **kwargs), которая возвращает
+    теги либо None, если проверять нечего. ETag строится из времени
+    изменения тегов и пользователя с его сессией; Last-Modified
+    отдаётся только анонимам, для которых страница одинакова, и для
+    304 не используется.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            tags = resolve_scopes(scopes, request, args, kwargs)
+            if not tags:
+                return view(request, *args, **kwargs)
+
+            stamps = get_tag_stamps(tags)
+            etag = get_etag(request, stamps)
+            last_modified = None
+            if not request.user.is_authenticated:
+                # Секунды округляются вверх, чтобы время не оказалось
+                # раньше правки.
+                last_modified = math.ceil(max(stamps.values()))
+
+            # 304 только по ETag: в Last-Modified две правки за одну
+            # секунду неразличимы.
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,303 @@
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def key(self, labels):
+        return (
+            self.name,
+            tuple(str(labels[label]) for label in self.labelnames),
+        )
+
+    def format(self, labels, value):
+        return [f'{self.name}{format_labels(self.labelnames, labels)} {value}']
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        shard = self.registry.shard()
+        key = self.key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    """Значение, которое растёт и убывает; потоки и процессы
+    складываются, поэтому inc и dec должны идти парами."""
+
+    type = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, *args, buckets=LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        shard = self.registry.shard()
+        key = self.key(labels)
+        # Счётчики по корзинам (последняя — +Inf) и сумма значений.
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = [0] * (len(self.buckets) + 2)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def format(self, labels, value):
+        lines = []
+        total = 0
+        bounds = [*map(format_number, self.buckets), '+Inf']
+        for bound, count in zip(bounds, value):
+            total += count
+            bucket_labels = format_labels(
+                (*self.labelnames, 'le'), (*labels, bound)
+            )
+            lines.append(f'{self.name}_bucket{bucket_labels} {total}')
+        labels = format_labels(self.labelnames, labels)
+        lines.append(f'{self.name}_sum{labels} {format_number(value[-1])}')
+        lines.append(f'{self.name}_count{labels} {total}')
+        return lines
+
+
+def format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def escape(value):
+    return (
+        value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    )
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{escape(value)}"' for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+def merge(totals, key, value):
+    if isinstance(value, list):
+        current = totals.get(key)
+        if current is None:
+            totals[key] = list(value)
+        else:
+            totals[key] = [a + b for a, b in zip(current, value)]
+    else:
+        totals[key] = totals.get(key, 0) + value
+
+
+class Registry:
+    """Реестр метрик.
+
+    Каждый поток пишет в свой шард без блокировок; шарды складываются
+    при чтении. Процессы раз в METRICS_FLUSH_INTERVAL секунд сохраняют
+    свои значения в файл в METRICS_DIR, и /metrics складывает файлы
+    всех процессов.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.shards = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.next_flush = 0
+        self.worker_id = None
+
+    def shard(self):
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = {}
+            with self.lock:
+                self.shards.append(shard)
+            return shard
+
+    def register(self, metric_class, *args, **kwargs):
+        metric = metric_class(self, *args, **kwargs)
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter, *args, **kwargs)
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge, *args, **kwargs)
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram, *args, **kwargs)
+
+    def snapshot(self):
+        """Сумма значений всех потоков процесса."""
+        totals = {}
+        with self.lock:
+            shards = list(self.shards)
+        for shard in shards:
+            for key, value in shard.copy().items():
+                merge(totals, key, value)
+        return totals
+
+    def get_path(self):
+        worker_id = self.worker_id or os.getpid()
+        return os.path.join(settings.METRICS_DIR, f'{worker_id}.json')
+
+    def flush(self):
+        path = self.get_path()
+        samples = [
+            [name, list(labels), value]
+            for (name, labels), value in self.snapshot().items()
+        ]
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(samples, file)
+        os.replace(path + '.tmp', path)
+
+    def maybe_flush(self):
+        if not settings.METRICS_DIR or time.monotonic() < self.next_flush:
+            return
+        if not self.flush_lock.acquire(blocking=False):
+            return
+        try:
+            interval = settings.METRICS_FLUSH_INTERVAL
+            self.next_flush = time.monotonic() + interval
+            self.flush()
+        finally:
+            self.flush_lock.release()
+
+    def collect(self):
+        """Значения всех процессов или только этого, если METRICS_DIR
+        не задан."""
+        if not settings.METRICS_DIR:
+            return self.snapshot()
+
+        self.flush()
+        totals = {}
+        pattern = os.path.join(settings.METRICS_DIR, '*.json')
+        for path in glob.glob(pattern):
+            try:
+                with open(path, encoding='utf-8') as file:
+                    samples = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in samples:
+                merge(totals, (name, tuple(labels)), value)
+        return totals
+
+    def render(self):
+        """Значения в текстовом формате Prometheus."""
+        by_name = {}
+        for (name, labels), value in self.collect().items():
+            by_name.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            for labels, value in sorted(by_name.get(name, [])):
+                lines.extend(metric.format(labels, value))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUESTS = registry.counter(
+    'yatube_requests_total',
+    'Запросы по view и коду ответа.',
+    ('view', 'status'),
+)
+REQUEST_SECONDS = registry.histogram(
+    'yatube_request_duration_seconds',
+    'Время ответа по view.',
+    ('view',),
+)
+REQUEST_QUERIES = registry.histogram(
+    'yatube_request_queries',
+    'SQL-запросов на один ответ по view.',
+    ('view',),
+    buckets=QUERY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = registry.gauge(
+    'yatube_requests_in_progress',
+    'Запросы, которые обрабатываются сейчас.',
+)
+PAGE_CACHE = registry.counter(
+    'yatube_page_cache_total',
+    'Обращения к кэшу страниц: hit или miss.',
+    ('page', 'result'),
+)
+THUMBNAIL_SECONDS = registry.histogram(
+    'yatube_thumbnail_generation_seconds',
+    'Время создания миниатюры.',
+)
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def get_view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+class MetricsMiddleware:
+    """Считает запросы, их время и число SQL-запросов по view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(counter))
+                response = self.get_response(request)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+
+        view = get_view_name(request)
+        REQUEST_SECONDS.observe(time.perf_counter() - start, view=view)
+        REQUEST_QUERIES.observe(counter.count, view=view)
+        REQUESTS.inc(view=view, status=response.status_code)
+        registry.maybe_flush()
+        return response
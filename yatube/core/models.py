@@ -0,0 +1,22 @@
+from django.db import models
+
+
+class StoredFile(models.Model):
+    """Счётчик ссылок на файл в хранилище по содержимому."""
+
+    name = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name='Имя файла'
+    )
+    refs = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число ссылок'
+    )
+
+    def __str__(self):
+        return f'{self.name} ({self.refs})'
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
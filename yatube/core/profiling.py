@@ -0,0 +1,131 @@
+import os
+import random
+import sys
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import get_view_name
+
+
+HEADER = 'HTTP_X_PROFILE'
+QUERY_FLAG = 'profile'
+SALT = 'core.profiling'
+SIGNED_VALUE = 'profile'
+
+_write_lock = threading.Lock()
+
+
+def make_signature():
+    """Значение заголовка X-Profile, включающее профилирование."""
+    return signing.TimestampSigner(salt=SALT).sign(SIGNED_VALUE)
+
+
+def has_signature(request):
+    value = request.META.get(HEADER)
+    if not value:
+        return False
+    try:
+        return signing.TimestampSigner(salt=SALT).unsign(
+            value, max_age=settings.PROFILER_SIGNATURE_MAX_AGE
+        ) == SIGNED_VALUE
+    except signing.BadSignature:
+        return False
+
+
+def should_profile(request):
+    if has_signature(request):
+        return True
+    if QUERY_FLAG in request.GET and request.user.is_staff:
+        return True
+    rate = settings.PROFILER_SAMPLE_RATE
+    return bool(rate) and random.randrange(rate) == 0
+
+
+def get_frame_name(frame):
+    module = frame.f_globals.get('__name__', '?')
+    return f'{module}:{frame.f_code.co_name}'.replace(';', ':')
+
+
+def collapse(frame, root):
+    """Стек от root до frame в формате свёрнутых стеков:
+    имена кадров через точку с запятой."""
+    names = []
+    while frame is not None:
+        names.append(get_frame_name(frame))
+        if frame is root:
+            break
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Sampler:
+    """Статистический профилировщик: фоновый поток раз в interval
+    секунд снимает стек потока запроса и считает одинаковые стеки."""
+
+    def __init__(self, root, interval):
+        self.root = root
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while True:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame, self.root)] += 1
+            del frame
+            if self.stopped.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+
+def get_profile_dir(view_name):
+    return os.path.join(settings.PROFILER_DIR, view_name.replace(':', '.'))
+
+
+def write_stacks(view_name, stacks):
+    """Дописывает стеки в файл процесса в каталоге view."""
+    directory = get_profile_dir(view_name)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.folded')
+    lines = ''.join(f'{stack} {count}\n' for stack, count in stacks.items())
+    with _write_lock, open(path, 'a', encoding='utf-8') as file:
+        file.write(lines)
+
+
+class ProfilingMiddleware:
+    """Профилирует запрос сэмплирующим профилировщиком, если пришёл
+    подписанный заголовок X-Profile, администратор добавил ?profile
+    или запрос попал в выборку 1 из PROFILER_SAMPLE_RATE.
+
+    Стеки пишутся в PROFILER_DIR по имени URL; без PROFILER_DIR
+    middleware выключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_DIR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+
+        with Sampler(sys._getframe(), settings.PROFILER_INTERVAL) as sampler:
+            response = self.get_response(request)
+        if sampler.stacks:
+            write_stacks(get_view_name(request), sampler.stacks)
+        return response
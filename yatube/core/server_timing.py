@@ -0,0 +1,124 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+logger = logging.getLogger('yatube.server_timing')
+
+METRICS = (
+    ('db', '{db_queries} queries'),
+    ('cache', '{cache_hits} hits, {cache_misses} misses'),
+    ('tpl', ''),
+    ('thumb', '{thumbnails} thumbnails'),
+)
+
+_local = threading.local()
+
+
+class Timings:
+    """Время и счётчики одного запроса по источникам."""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.counts = Counter()
+        self.active = set()
+
+
+def current():
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def measure(name):
+    """Добавляет время блока к источнику name текущего запроса.
+
+    Вложенные замеры того же источника не учитываются повторно:
+    внутри них менеджер отдаёт None, а снаружи — Timings запроса.
+    """
+    timings = current()
+    if timings is None or name in timings.active:
+        yield None
+        return
+
+    timings.active.add(name)
+    start = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        timings.durations[name] += time.perf_counter() - start
+        timings.active.discard(name)
+
+
+def time_query(execute, sql, params, many, context):
+    with measure('db') as timings:
+        if timings is not None:
+            timings.counts['db_queries'] += 1
+        return execute(sql, params, many, context)
+
+
+def get_header(timings, total):
+    parts = []
+    for name, description in METRICS:
+        part = f'{name};dur={timings.durations[name] * 1000:.2f}'
+        if description:
+            desc = description.format_map(timings.counts)
+            part += f';desc="{desc}"'
+        parts.append(part)
+    parts.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(parts)
+
+
+def get_log_fields(request, response, timings, total):
+    fields = {
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'total_ms': round(total * 1000, 2),
+    }
+    for name, _ in METRICS:
+        fields[f'{name}_ms'] = round(timings.durations[name] * 1000, 2)
+    fields.update(timings.counts)
+    return fields
+
+
+class ServerTimingMiddleware:
+    """Отдаёт в заголовке Server-Timing, сколько запрос провёл в базе,
+    кэше, шаблонах и миниатюрах.
+
+    Время шаблонов включает запросы и обращения к кэшу из шаблонов.
+    Выключается настройкой SERVER_TIMING и тогда не стоит ничего:
+    Django убирает middleware из цепочки.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = _local.timings = Timings()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(time_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.timings = None
+        total = time.perf_counter() - start
+
+        response['Server-Timing'] = get_header(timings, total)
+        if settings.SERVER_TIMING_LOG:
+            logger.info(json.dumps(
+                get_log_fields(request, response, timings, total)
+            ))
+        return response
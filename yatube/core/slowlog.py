@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.template.base import Node
+from django.utils import timezone
+
+
+PARAM_LENGTH = 200
+SOURCE_DEPTH = 5
+
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+
+def get_logger():
+    """Логгер медленных запросов с ротацией файла SLOW_QUERY_LOG."""
+    logger = logging.getLogger('yatube.slow_queries')
+    path = settings.SLOW_QUERY_LOG
+    if path not in _handlers:
+        with _handlers_lock:
+            if path not in _handlers:
+                for handler in list(logger.handlers):
+                    logger.removeHandler(handler)
+                    handler.close()
+                handler = RotatingFileHandler(
+                    path,
+                    maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+                    backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+                    encoding='utf-8',
+                )
+                logger.addHandler(handler)
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                _handlers.clear()
+                _handlers[path] = handler
+    return logger
+
+
+def is_project_file(filename):
+    return (
+        filename.startswith(settings.BASE_DIR)
+        and 'site-packages' not in filename
+        and filename != __file__
+    )
+
+
+def find_sources(frame):
+    """View, кадры кода проекта и строка шаблона, из-за которых
+    выполнен запрос."""
+    view = None
+    template = None
+    source = []
+    while frame is not None:
+        code = frame.f_code
+        if template is None and code is Node.render_annotated.__code__:
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                template = {'name': origin.name, 'line': token.lineno}
+        elif is_project_file(code.co_filename):
+            module = frame.f_globals.get('__name__', '')
+            if len(source) < SOURCE_DEPTH:
+                source.append(
+                    f'{os.path.relpath(code.co_filename, settings.BASE_DIR)}'
+                    f':{frame.f_lineno} in {code.co_name}'
+                )
+            if module.endswith('views'):
+                view = f'{module}.{code.co_name}'
+        frame = frame.f_back
+    return view, template, source
+
+
+def explain(cursor, sql, params, many):
+    """План запроса; отдельный курсор без execute_wrappers, чтобы
+    не трогать результат исходного и не попасть в журнал самому."""
+    if many or not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    prefix = (
+        'EXPLAIN QUERY PLAN ' if cursor.db.vendor == 'sqlite' else 'EXPLAIN '
+    )
+    explain_cursor = cursor.db.create_cursor()
+    try:
+        with cursor.db.wrap_database_errors:
+            explain_cursor.execute(prefix + sql, params)
+            return [str(row[-1]) for row in explain_cursor.fetchall()]
+    except DatabaseError:
+        return None
+    finally:
+        explain_cursor.close()
+
+
+def format_params(params, many):
+    if params is None or many:
+        return None
+    return [repr(param)[:PARAM_LENGTH] for param in params]
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    """execute_wrapper: пишет в SLOW_QUERY_LOG запросы дольше
+    SLOW_QUERY_THRESHOLD_MS вместе с их источником и планом."""
+    if not settings.SLOW_QUERY_LOG:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - start) * 1000
+        if duration >= settings.SLOW_QUERY_THRESHOLD_MS:
+            view, template, source = find_sources(sys._getframe(1))
+            get_logger().info(json.dumps({
+                'time': timezone.now().isoformat(),
+                'duration_ms': round(duration, 3),
+                'sql': sql,
+                'params': format_params(params, many),
+                'view': view,
+                'template': template,
+                'source': source,
+                'plan': explain(context['cursor'], sql, params, many),
+            }, ensure_ascii=False))
+
+
+def install(sender, connection, **kwargs):
+    # Соединение может открыться внутри блока execute_wrapper() другого
+    # middleware, который при выходе снимает последний элемент списка,
+    # поэтому обёртка журнала ставится в начало.
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, log_slow_queries)
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import StoredFile
+from .tracing import span
+
+
+CONTENT_NAME = re.compile(
+    r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$'
+)
+
+
+def traced(name):
+    def method(self, path, *args, **kwargs):
+        call = getattr(super(TracedFileSystemStorage, self), name)
+        with span('storage', operation=name.lstrip('_'), path=path):
+            return call(path, *args, **kwargs)
+    method.__name__ = name
+    return method
+
+
+class TracedFileSystemStorage(FileSystemStorage):
+    """Файловое хранилище, операции которого попадают в трассу."""
+
+    _open = traced('_open')
+    _save = traced('_save')
+    delete = traced('delete')
+    exists = traced('exists')
+    size = traced('size')
+
+
+class ContentAddressedStorage(TracedFileSystemStorage):
+    """Хранилище, в котором имя файла -- SHA-256 его содержимого.
+
+    Файлы раскладываются по двум уровням подкаталогов по первым
+    символам хеша внутри каталога upload_to: posts/ab/cd/abcd...jpg.
+    Одинаковые загрузки хранятся один раз: save() увеличивает счётчик
+    ссылок StoredFile, а delete() уменьшает его и удаляет файл, когда
+    ссылок не осталось. Файлы без счётчика, сохранённые до перехода
+    на это хранилище, delete() не трогает.
+    """
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        hexdigest = digest.hexdigest()
+        directory = posixpath.dirname(name.replace('\\', '/'))
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(
+            directory, hexdigest[:2], hexdigest[2:4], hexdigest + extension
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        # Счётчик увеличивается до проверки файла и держится до конца
+        # транзакции: delete() того же файла ждёт её и уже не удалит его.
+        with transaction.atomic():
+            add_reference(name)
+            if not self.exists(name):
+                self.write(name, content)
+        return name
+
+    def write(self, name, content):
+        # Файл появляется под своим именем только целиком, поэтому
+        # exists() в save() не увидит недописанную копию.
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary), self.path(name))
+
+    def delete(self, name):
+        # Файл удаляется в той же транзакции, что и последняя ссылка,
+        # пока строка счётчика заблокирована: save() того же содержимого
+        # не добавит ссылку между проверкой и удалением.
+        with transaction.atomic():
+            if release_reference(name):
+                super().delete(name)
+
+
+def is_content_name(name):
+    """Имя выдано ContentAddressedStorage, а не осталось от upload_to."""
+    return bool(CONTENT_NAME.search(name))
+
+
+def add_reference(name, count=1):
+    updated = StoredFile.objects.filter(name=name).update(
+        refs=F('refs') + count
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                StoredFile.objects.create(name=name, refs=count)
+        except IntegrityError:
+            add_reference(name, count)
+
+
+def release_reference(name):
+    """Уменьшает счётчик ссылок; True, если ссылок не осталось.
+
+    Вызывается в транзакции: UPDATE блокирует строку счётчика до её
+    конца, поэтому прочитанное после него число ссылок не изменится.
+    """
+    updated = StoredFile.objects.filter(name=name, refs__gt=0).update(
+        refs=F('refs') - 1
+    )
+    if not updated:
+        return False
+    stored = StoredFile.objects.select_for_update().get(name=name)
+    if stored.refs:
+        return False
+    stored.delete()
+    return True
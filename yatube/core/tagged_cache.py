@@ -0,0 +1,190 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+from .metrics import PAGE_CACHE
+from .tiered_cache import tiered
+
+
+PAGE_KEY = 'page:{}:{}'
+
+
+def new_version():
+    # Версия потерянного тега не должна совпасть с уже сохранённой.
+    return int(time.time() * 1000)
+
+
+def get_tag_key(tag):
+    return 'tag:' + hashlib.md5(tag.encode('utf-8')).hexdigest()
+
+
+def get_tag_versions(tags):
+    """Возвращает текущие версии тегов, создавая недостающие."""
+    keys = {get_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(list(keys))
+
+    versions = {}
+    for key, tag in keys.items():
+        if key not in found:
+            cache.add(key, new_version(), None)
+            found[key] = cache.get(key)
+        versions[tag] = found[key]
+    return versions
+
+
+def get_stamp_key(tag):
+    return 'stamp:' + hashlib.md5(tag.encode('utf-8')).hexdigest()
+
+
+def get_tag_stamps(tags):
+    """Возвращает время последнего изменения тегов; для неизвестных
+    тегов им считается текущий момент."""
+    keys = {get_stamp_key(tag): tag for tag in tags}
+    found = cache.get_many(list(keys))
+
+    stamps = {}
+    for key, tag in keys.items():
+        if key not in found:
+            now = time.time()
+            cache.add(key, now, None)
+            found[key] = cache.get(key, now)
+        stamps[tag] = found[key]
+    return stamps
+
+
+def touch_tags(*tags):
+    """Отмечает, что данные тегов изменились, не сбрасывая кэш."""
+    now = time.time()
+    cache.set_many({get_stamp_key(tag): now for tag in tags}, None)
+
+
+def changed_since(tags, since):
+    """Менялся ли какой-нибудь из тегов в момент since или позже."""
+    stamps = cache.get_many([get_stamp_key(tag) for tag in tags])
+    return any(stamp >= since for stamp in stamps.values())
+
+
+def invalidate_tags(*tags):
+    """Делает устаревшими все записи, помеченные этими тегами."""
+    # Время изменения ставится раньше версии: кто прочитал новую версию,
+    # увидит и новое время в changed_since.
+    touch_tags(*tags)
+    for tag in set(tags):
+        key = get_tag_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, new_version(), None)
+
+
+def invalidate_tags_on_commit(*tags):
+    """invalidate_tags сейчас и ещё раз после коммита текущей транзакции.
+
+    До коммита читатель видит старые данные и может закэшировать их под
+    уже новой версией; второй сброс делает такую запись устаревшей.
+    """
+    invalidate_tags(*tags)
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+def add_cache_tags(request, *tags):
+    """Помечает кэшируемую страницу тегами, от которых она зависит."""
+    if hasattr(request, 'cache_tags'):
+        request.cache_tags.update(tags)
+
+
+def is_fresh(entry):
+    return entry['tags'] == get_tag_versions(entry['tags'])
+
+
+def cached_by_tags(key, build, timeout):
+    """Кэширует результат build() до смены тегов, которые он вернул.
+
+    build возвращает пару (значение, теги).
+    """
+    built = []
+
+    def build_entry():
+        started = time.time()
+        value, tags = build()
+        built.append(value)
+        versions = get_tag_versions(tags)
+        # Данные, изменённые во время build, могли не попасть в value,
+        # а новая версия уже прочитана.
+        if changed_since(tags, started):
+            return None
+        return {'tags': versions, 'value': value}
+
+    entry = tiered.get_or_set(key, build_entry, timeout, is_fresh)
+    return built[0] if built else entry['value']
+
+
+def get_page_key(request, key_prefix):
+    url = hashlib.md5(request.build_absolute_uri().encode('utf-8'))
+    return PAGE_KEY.format(key_prefix, url.hexdigest())
+
+
+def tagged_cache_page(timeout, key_prefix, tags=()):
+    """Кэширует страницу для анонимных пользователей до смены тегов;
+    без тегов заменяет cache_page. Страница хранится в двухуровневом
+    кэше tiered и пересчитывается одним запросом.
+
+    tags -- шаблоны тегов, которые форматируются аргументами view;
+    остальные теги view добавляет через add_cache_tags.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+
+            built = []
+
+            def build():
+                started = time.time()
+                static_tags = get_tag_versions(
+                    tag.format(**kwargs) for tag in tags
+                )
+                request.cache_tags = set()
+                response = view(request, *args, **kwargs)
+                built.append(response)
+                if response.status_code != 200 or response.streaming:
+                    return None
+
+                # Теги, добавленные view, известны только после него:
+                # если они менялись во время рендера, страница могла
+                # собраться из старых данных, а версия уже новая.
+                dynamic_tags = request.cache_tags - set(static_tags)
+                versions = get_tag_versions(dynamic_tags)
+                if changed_since(dynamic_tags, started):
+                    return None
+                versions.update(static_tags)
+                return {
+                    'tags': versions,
+                    'content': response.content,
+                    'content_type': response['Content-Type'],
+                    'status': response.status_code,
+                }
+
+            entry = tiered.get_or_set(
+                get_page_key(request, key_prefix), build, timeout, is_fresh
+            )
+            if built:
+                PAGE_CACHE.inc(page=key_prefix, result='miss')
+                return built[0]
+
+            PAGE_CACHE.inc(page=key_prefix, result='hit')
+            return HttpResponse(
+                entry['content'],
+                content_type=entry['content_type'],
+                status=entry['status'],
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,38 @@
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from .server_timing import measure
+from .tracing import span
+
+
+TRACED_INCLUDE = 'core.templatetags.traced_include'
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        with span('template', template=self.origin.template_name):
+            with measure('tpl'):
+                return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблоны Django, время отрисовки которых попадает в Server-Timing,
+    а сами шаблоны и их {% include %} — в трассу запроса."""
+
+    def __init__(self, params):
+        params = params.copy()
+        options = params['OPTIONS'] = params.get('OPTIONS', {}).copy()
+        options['builtins'] = [*options.get('builtins', []), TRACED_INCLUDE]
+        super().__init__(params)
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(
+                self.engine.get_template(template_name), self
+            )
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,22 @@
+from django import template
+from django.template.loader_tags import IncludeNode, do_include
+
+from core.tracing import span
+
+
+register = template.Library()
+
+
+class TracedIncludeNode(IncludeNode):
+
+    def render(self, context):
+        with span('include', template=str(self.template.var)):
+            return super().render(context)
+
+
+@register.tag('include')
+def traced_include(parser, token):
+    """{% include %}, отрисовка которого попадает в трассу запроса."""
+    node = do_include(parser, token)
+    node.__class__ = TracedIncludeNode
+    return node
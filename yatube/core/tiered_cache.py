@@ -0,0 +1,175 @@
+import logging
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.db import OperationalError
+
+from .cache_backends import cache_cleared
+
+
+logger = logging.getLogger('yatube.cache')
+
+LOCK_KEY = 'lock:{}'
+LOCK_POLL = 0.05
+
+
+class TieredCache:
+    """Двухуровневый кэш: L1 в памяти процесса перед общим кэшем.
+
+    get_or_set пересчитывает значение в одном запросе на все процессы:
+    остальные в это время получают устаревшее значение, а если его нет,
+    ждут результата до CACHE_LOCK_WAIT секунд. Значение пересчитывается
+    заранее с вероятностью, растущей к концу срока (XFetch), а если
+    пересчёт упал с OperationalError, отдаётся устаревшее.
+
+    Значения из L1 общие для потоков процесса, менять их нельзя.
+    """
+
+    def __init__(self, cache=None):
+        self.shared = cache or default_cache
+        self.l1 = OrderedDict()
+        self.lock = threading.Lock()
+        cache_cleared.connect(self.clear_l1)
+
+    def l1_get(self, key):
+        with self.lock:
+            item = self.l1.get(key)
+            if item is None:
+                return None
+            expires, entry = item
+            if expires <= time.monotonic():
+                del self.l1[key]
+                return None
+            self.l1.move_to_end(key)
+            return entry
+
+    def l1_set(self, key, entry):
+        timeout = settings.L1_CACHE_TIMEOUT
+        if not timeout:
+            return
+        with self.lock:
+            self.l1[key] = (time.monotonic() + timeout, entry)
+            self.l1.move_to_end(key)
+            while len(self.l1) > settings.L1_CACHE_SIZE:
+                self.l1.popitem(last=False)
+
+    def clear_l1(self, **kwargs):
+        with self.lock:
+            self.l1.clear()
+
+    def get_entry(self, key):
+        entry = self.l1_get(key)
+        if entry is None:
+            entry = self.shared.get(key)
+            if entry is not None:
+                self.l1_set(key, entry)
+        return entry
+
+    def delete(self, key):
+        with self.lock:
+            self.l1.pop(key, None)
+        self.shared.delete(key)
+
+    def should_refresh(self, entry):
+        expires = entry['expires']
+        if expires is None:
+            return False
+        # XFetch: чем дольше считалось значение и чем ближе конец
+        # срока, тем вероятнее досрочный пересчёт.
+        beta = settings.CACHE_EARLY_REFRESH_BETA
+        early = -entry['delta'] * beta * math.log(1 - random.random())
+        return time.time() + early >= expires
+
+    def is_usable(self, entry, is_fresh):
+        if entry is None:
+            return False
+        return is_fresh is None or is_fresh(entry['value'])
+
+    def wait(self, key, is_fresh):
+        """Ждёт значение, которое пересчитывает другой запрос."""
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL)
+            entry = self.shared.get(key)
+            if self.is_usable(entry, is_fresh):
+                self.l1_set(key, entry)
+                return entry
+            if self.shared.get(LOCK_KEY.format(key)) is None:
+                return None
+        return None
+
+    def refresh(self, key, build, timeout, stale):
+        start = time.perf_counter()
+        try:
+            value = build()
+        except OperationalError:
+            if stale is None:
+                raise
+            logger.warning('Отдано устаревшее значение %s', key, exc_info=True)
+            return stale['value']
+        if value is None:
+            return None
+
+        entry = {
+            'value': value,
+            'expires': None if timeout is None else time.time() + timeout,
+            'delta': time.perf_counter() - start,
+        }
+        self.shared.set(
+            key, entry,
+            None if timeout is None
+            else timeout + settings.STALE_CACHE_TIMEOUT,
+        )
+        self.l1_set(key, entry)
+        return value
+
+    def get_or_set(self, key, build, timeout, is_fresh=None):
+        """Значение по ключу или результат build(); None не кэшируется.
+
+        is_fresh(value) может дополнительно признать значение
+        устаревшим, например по версиям тегов.
+        """
+        entry = self.get_entry(key)
+        usable = self.is_usable(entry, is_fresh)
+        if usable and not self.should_refresh(entry):
+            return entry['value']
+
+        lock_key = LOCK_KEY.format(key)
+        locked = self.shared.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT)
+        if not locked:
+            if entry is not None:
+                return entry['value']
+            waited = self.wait(key, is_fresh)
+            if waited is not None:
+                return waited['value']
+        try:
+            return self.refresh(key, build, timeout, entry)
+        finally:
+            if locked:
+                self.shared.delete(lock_key)
+
+
+tiered = TieredCache()
+
+
+def cached(timeout, key):
+    """Кэширует результат функции в двухуровневом кэше.
+
+    key -- шаблон ключа, который форматируется аргументами функции.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return tiered.get_or_set(
+                key.format(*args, **kwargs),
+                partial(func, *args, **kwargs),
+                timeout,
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,183 @@
+import atexit
+import json
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import get_view_name
+
+
+SQL_LENGTH = 500
+
+_local = threading.local()
+
+
+class Trace:
+    """Спаны одного запроса; стек открытых спанов задаёт родителя."""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans = []
+        self.stack = []
+        self.next_id = 1
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Открывает спан внутри текущей трассы и отдаёт его словарь,
+    чтобы можно было дописать атрибуты; вне трассы отдаёт None."""
+    trace = current_trace()
+    if trace is None:
+        yield None
+        return
+
+    record = {
+        'trace_id': trace.trace_id,
+        'span_id': trace.next_id,
+        'parent_id': trace.stack[-1] if trace.stack else None,
+        'name': name,
+        'start': time.time(),
+        'attributes': attributes,
+    }
+    trace.next_id += 1
+    trace.stack.append(record['span_id'])
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['duration_ms'] = round(
+            (time.perf_counter() - start) * 1000, 3
+        )
+        trace.stack.pop()
+        trace.spans.append(record)
+
+
+def trace_query(execute, sql, params, many, context):
+    with span('db', sql=sql[:SQL_LENGTH], many=many):
+        return execute(sql, params, many, context)
+
+
+class Writer:
+    """Фоновый поток, который дописывает спаны в JSONL.
+
+    Запрос только кладёт трассу в очередь; если очередь переполнена,
+    трасса отбрасывается, а не задерживает ответ.
+    """
+
+    def __init__(self):
+        self.queue = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.dropped = 0
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.queue = queue.Queue(settings.TRACING_QUEUE_SIZE)
+                self.thread = threading.Thread(
+                    target=self.run, name='tracing-writer', daemon=True
+                )
+                self.thread.start()
+                atexit.register(self.close)
+
+    def submit(self, path, spans):
+        if self.thread is None:
+            self.start()
+        try:
+            self.queue.put_nowait((path, spans))
+        except queue.Full:
+            self.dropped += 1
+
+    def write(self, batch):
+        by_path = {}
+        for path, spans in batch:
+            by_path.setdefault(path, []).extend(spans)
+        for path, spans in by_path.items():
+            with open(path, 'a', encoding='utf-8') as file:
+                for record in spans:
+                    file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            try:
+                self.write([item for item in batch if item is not None])
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Ждёт, пока все трассы из очереди будут записаны."""
+        if self.thread is not None:
+            self.queue.join()
+
+    def close(self):
+        with self.lock:
+            if self.thread is None:
+                return
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+
+writer = Writer()
+
+
+class TracingMiddleware:
+    """Записывает трассу запроса: view, SQL-запросы, обращения к кэшу,
+    шаблоны, {% include %}, миниатюры и операции с хранилищем.
+
+    Решение о записи принимается в начале запроса с вероятностью
+    TRACING_SAMPLE_RATE; остальные запросы идут без спанов. Спаны
+    пишет в TRACING_LOG фоновый поток; без TRACING_LOG middleware
+    выключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.TRACING_LOG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.TRACING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        trace = _local.trace = Trace()
+        try:
+            with span(
+                'request', method=request.method, path=request.path
+            ) as root, ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(trace_query)
+                    )
+                response = self.get_response(request)
+                root['attributes'].update(
+                    view=get_view_name(request),
+                    status=response.status_code,
+                )
+        finally:
+            _local.trace = None
+
+        writer.submit(settings.TRACING_LOG, trace.spans)
+        response['X-Trace-Id'] = trace.trace_id
+        return response
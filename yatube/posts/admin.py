@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.db import connection
 
 from .models import Group, Post
+from .search import FTS_TABLE, build_match, get_terms
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,6 +12,24 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по индексу FTS5 вместо LIKE по всей таблице."""
+        terms = get_terms(search_term)
+        if not terms or connection.vendor != 'sqlite':
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        # pk__in=RawSQL(...) дало бы IN ((SELECT ...)), то есть
+        # скалярный подзапрос с одной строкой.
+        matched = queryset.extra(
+            where=[
+                f'{Post._meta.db_table}.id IN '
+                f'(SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)'
+            ],
+            params=[build_match(terms)],
+        )
+        return matched, False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserStats
+
+
+def get_stats(user):
+    """Возвращает счётчики пользователя, создавая их при отсутствии."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        reconcile_users([user.pk])
+        return UserStats.objects.get(user_id=user.pk)
+
+
+def change_stats(user_id, **deltas):
+    updated = UserStats.objects.filter(user_id=user_id).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+    if not updated and any(delta > 0 for delta in deltas.values()):
+        reconcile_users([user_id])
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def count_by(queryset, field):
+    return dict(
+        queryset.values_list(field).annotate(total=Count('pk')).order_by()
+    )
+
+
+@transaction.atomic
+def reconcile_users(user_ids):
+    """Пересчитывает счётчики постов и подписок пользователей."""
+    user_ids = list(user_ids)
+    posts = count_by(Post.objects.filter(author_id__in=user_ids), 'author_id')
+    followers = count_by(
+        Follow.objects.filter(author_id__in=user_ids), 'author_id'
+    )
+    following = count_by(
+        Follow.objects.filter(user_id__in=user_ids), 'user_id'
+    )
+
+    UserStats.objects.filter(user_id__in=user_ids).delete()
+    UserStats.objects.bulk_create(
+        UserStats(
+            user_id=user_id,
+            posts_count=posts.get(user_id, 0),
+            followers_count=followers.get(user_id, 0),
+            following_count=following.get(user_id, 0),
+        )
+        for user_id in user_ids
+    )
+
+
+def reconcile_comments(post_ids):
+    """Пересчитывает количество комментариев у постов."""
+    comments = Comment.objects.filter(
+        post_id=OuterRef('pk')
+    ).order_by().values('post_id').annotate(
+        total=Count('pk')
+    ).values('total')
+
+    Post.objects.filter(pk__in=list(post_ids)).update(
+        comments_count=Coalesce(Subquery(comments), Value(0))
+    )
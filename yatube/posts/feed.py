@@ -0,0 +1,155 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import FeedEntry, Follow, Post
+
+
+BATCH_SIZE = 500
+
+
+def trim_feeds(user_ids):
+    """Обрезает ленты пользователей до FEED_MAX_LENGTH записей."""
+    max_length = settings.FEED_MAX_LENGTH
+    oldest_kept = FeedEntry.objects.filter(
+        user_id=OuterRef('user_id')
+    ).order_by('-pub_date').values('pub_date')[max_length - 1:max_length]
+
+    FeedEntry.objects.filter(
+        user_id__in=list(user_ids),
+        pub_date__lt=Subquery(oldest_kept),
+    ).delete()
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    follower_ids = list(
+        Follow.objects.filter(
+            author_id=post.author_id
+        ).values_list('user_id', flat=True)
+    )
+    if not follower_ids:
+        return
+
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in follower_ids
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim_feeds(follower_ids)
+
+
+def backfill_feed(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты автора."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date'
+    ).values_list('pk', 'pub_date')[:settings.FEED_MAX_LENGTH]
+
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim_feeds([user_id])
+
+
+def prune_feed(user_id, author_id):
+    """Убирает из ленты подписчика посты автора."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+REBUILD_SQL = """
+    INSERT INTO {feed} (
+        {feed_user}, {feed_post}, {feed_author}, {feed_pub_date}
+    )
+    SELECT user_id, post_id, author_id, pub_date FROM (
+        SELECT
+            follow.{follow_user} AS user_id,
+            latest.post_id,
+            latest.author_id,
+            latest.pub_date,
+            ROW_NUMBER() OVER (
+                PARTITION BY follow.{follow_user}
+                ORDER BY latest.pub_date DESC, latest.post_id DESC
+            ) AS position
+        FROM {follow} follow
+        JOIN (
+            SELECT post_id, author_id, pub_date FROM (
+                SELECT
+                    {post_id} AS post_id,
+                    {post_author} AS author_id,
+                    {pub_date} AS pub_date,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY {post_author}
+                        ORDER BY {pub_date} DESC, {post_id} DESC
+                    ) AS position
+                FROM {post}
+                WHERE {post_author} IN (
+                    SELECT {follow_author} FROM {follow}
+                    WHERE {follow_user} IN ({users})
+                )
+            ) ranked
+            WHERE position <= %s
+        ) latest ON latest.author_id = follow.{follow_author}
+        WHERE follow.{follow_user} IN ({users})
+    ) feed
+    WHERE position <= %s
+"""
+
+
+def get_rebuild_sql(user_count):
+    def column(model, name):
+        return quote_name(model._meta.get_field(name).column)
+
+    quote_name = connection.ops.quote_name
+    return REBUILD_SQL.format(
+        feed=quote_name(FeedEntry._meta.db_table),
+        feed_user=column(FeedEntry, 'user'),
+        feed_post=column(FeedEntry, 'post'),
+        feed_author=column(FeedEntry, 'author'),
+        feed_pub_date=column(FeedEntry, 'pub_date'),
+        follow=quote_name(Follow._meta.db_table),
+        follow_user=column(Follow, 'user'),
+        follow_author=column(Follow, 'author'),
+        post=quote_name(Post._meta.db_table),
+        post_id=column(Post, 'id'),
+        post_author=column(Post, 'author'),
+        pub_date=column(Post, 'pub_date'),
+        users=', '.join(['%s'] * user_count),
+    )
+
+
+def rebuild_feeds(user_ids):
+    """Собирает ленты пользователей заново по их подпискам.
+
+    Ленты собираются одним INSERT ... SELECT: каждый автор даёт не больше
+    FEED_MAX_LENGTH последних постов, из них каждому подписчику достаётся
+    FEED_MAX_LENGTH самых новых. Старые записи заменяются новыми в одной
+    транзакции, так что читатель не увидит пустую ленту. Возвращает
+    число записей.
+    """
+    user_ids = list(user_ids)
+    max_length = settings.FEED_MAX_LENGTH
+    with transaction.atomic(), connection.cursor() as cursor:
+        FeedEntry.objects.filter(user_id__in=user_ids).delete()
+        cursor.execute(
+            get_rebuild_sql(len(user_ids)),
+            [*user_ids, max_length, *user_ids, max_length],
+        )
+        return cursor.rowcount
@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
-from .models import Post, Comment, Follow
+from .models import Post, Comment, Follow, Group, User
+from .thumbnails import prepare_upload
 
 
 class PostForm(forms.ModelForm):
@@ -8,6 +10,15 @@ class PostForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.fields['group'].empty_label = 'Группа не выбрана'
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            image, color = prepare_upload(image)
+            self.instance.placeholder_color = color
+        elif not image:
+            self.instance.placeholder_color = ''
+        return image
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
@@ -23,3 +34,31 @@ class FollowForm(forms.ModelForm):
     class Meta:
         model = Follow
         fields = ('user', 'author')
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Поиск', max_length=200)
+    group = forms.SlugField(label='Группа', required=False)
+    author = forms.CharField(label='Автор', max_length=150, required=False)
+
+    def clean_group(self):
+        slug = self.cleaned_data['group']
+        if not slug:
+            return None
+        group_id = Group.objects.filter(slug=slug).values_list(
+            'pk', flat=True
+        ).first()
+        if group_id is None:
+            raise forms.ValidationError('Такой группы нет')
+        return group_id
+
+    def clean_author(self):
+        username = self.cleaned_data['author']
+        if not username:
+            return None
+        author_id = User.objects.filter(username=username).values_list(
+            'pk', flat=True
+        ).first()
+        if author_id is None:
+            raise forms.ValidationError('Такого автора нет')
+        return author_id
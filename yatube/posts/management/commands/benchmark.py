@@ -0,0 +1,386 @@
+import json
+import math
+import os
+import tempfile
+import time
+from collections import namedtuple
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.metrics import QueryCounter
+from core.tiered_cache import tiered
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+from posts.search import get_terms
+from posts.utils import (
+    FORWARD,
+    OFFSET_PAGES_LIMIT,
+    SORT_COMMENT,
+    SORT_POST,
+    CursorPaginator,
+)
+
+
+PERCENTILES = (50, 95, 99)
+FEED_ORDERING = ('-pub_date', '-post_id')
+COMMENT_ORDERING = ('-created', '-pk')
+
+Scenario = namedtuple(
+    'Scenario',
+    ['name', 'variant', 'client', 'method', 'url', 'data', 'prepare'],
+    defaults=(None, None),
+)
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def deep_cursor(queryset, depth, per_page, ordering):
+    """Курсор страницы номер depth + 1 или None, если данных меньше."""
+    paginator = CursorPaginator(queryset, per_page, ordering)
+    index = depth * per_page
+    rows = list(paginator.object_list[index - 1:index + 1])
+    if len(rows) < 2:
+        return None
+    return paginator.make_cursor(rows[0], FORWARD, depth + 1)
+
+
+def with_query(url, **params):
+    return f'{url}?{urlencode(params)}'
+
+
+def get_sample():
+    author = User.objects.order_by('-stats__posts_count').first()
+    if author is None or not Post.objects.exists():
+        raise CommandError(
+            'В базе нет постов: сначала запустите generate_dataset.'
+        )
+    reader = User.objects.order_by('-stats__following_count').first()
+    return {
+        'author': author,
+        'reader': reader,
+        'stranger': User.objects.exclude(pk=reader.pk).exclude(
+            following__user=reader
+        ).first() or author,
+        'group': Group.objects.annotate(
+            posts_total=Count('posts')
+        ).order_by('-posts_total').first(),
+        'post': Post.objects.order_by('-comments_count').first(),
+        'own_post': Post.objects.filter(author=author).first(),
+    }
+
+
+def list_scenarios(name, url, queryset, client, depth, ordering=None):
+    ordering = ordering or ('-pub_date', '-pk')
+    scenarios = [
+        Scenario(name, 'first', client, 'get', url),
+        Scenario(
+            name, 'offset', client, 'get',
+            with_query(url, page=OFFSET_PAGES_LIMIT),
+        ),
+    ]
+    cursor = deep_cursor(queryset, depth, SORT_POST, ordering)
+    if cursor:
+        scenarios.append(Scenario(
+            name, 'deep', client, 'get', with_query(url, cursor=cursor)
+        ))
+    return scenarios
+
+
+def get_scenarios(sample, depth):
+    """Запросы ко всем URL из posts.urls."""
+    author, reader = sample['author'], sample['reader']
+    stranger, group = sample['stranger'], sample['group']
+    post, own_post = sample['post'], sample['own_post']
+
+    scenarios = []
+    for client in ('guest', 'reader'):
+        scenarios += list_scenarios(
+            'index', reverse('posts:index'), Post.objects.all(),
+            client, depth,
+        )
+        if group:
+            scenarios += list_scenarios(
+                'group_list',
+                reverse('posts:group_list', args=[group.slug]),
+                Post.objects.filter(group=group), client, depth,
+            )
+        scenarios += list_scenarios(
+            'profile', reverse('posts:profile', args=[author.username]),
+            Post.objects.filter(author=author), client, depth,
+        )
+        scenarios.append(Scenario(
+            'post_detail', 'first', client, 'get',
+            reverse('posts:post_detail', args=[post.pk]),
+        ))
+
+    words = get_terms(post.text)
+    if words:
+        scenarios.append(Scenario(
+            'search', 'first', 'guest', 'get',
+            with_query(reverse('posts:search'), q=words[0]),
+        ))
+
+    comments_url = reverse('posts:post_comments', args=[post.pk])
+    scenarios.append(
+        Scenario('post_comments', 'first', 'guest', 'get', comments_url)
+    )
+    cursor = deep_cursor(
+        Comment.objects.filter(post=post), depth, SORT_COMMENT,
+        COMMENT_ORDERING,
+    )
+    if cursor:
+        scenarios.append(Scenario(
+            'post_comments', 'deep', 'guest', 'get',
+            with_query(comments_url, cursor=cursor),
+        ))
+
+    scenarios += list_scenarios(
+        'follow_index', reverse('posts:follow_index'),
+        FeedEntry.objects.filter(user=reader), 'reader', depth,
+        FEED_ORDERING,
+    )
+    scenarios += [
+        Scenario(
+            'post_create', 'form', 'author', 'get',
+            reverse('posts:post_create'),
+        ),
+        Scenario(
+            'post_edit', 'form', 'author', 'get',
+            reverse('posts:post_edit', args=[own_post.pk]),
+        ),
+        Scenario(
+            'add_comment', 'submit', 'reader', 'post',
+            reverse('posts:add_comment', args=[post.pk]),
+            {'text': 'Комментарий из бенчмарка'},
+        ),
+        Scenario(
+            'profile_follow', 'submit', 'reader', 'get',
+            reverse('posts:profile_follow', args=[stranger.username]),
+            prepare=lambda: Follow.objects.filter(
+                user=reader, author=stranger
+            ).delete(),
+        ),
+        Scenario(
+            'profile_unfollow', 'submit', 'reader', 'get',
+            reverse('posts:profile_unfollow', args=[stranger.username]),
+            prepare=lambda: Follow.objects.get_or_create(
+                user=reader, author=stranger
+            ),
+        ),
+    ]
+    return scenarios
+
+
+def get_cache_settings(directory):
+    """Кэш того же типа, что и default, но отдельный от кэша сайта:
+    бенчмарк очищает его перед холодными замерами."""
+    config = dict(settings.CACHES['default'])
+    if 'LOCATION' in config:
+        config['LOCATION'] = os.path.join(directory, 'cache.sqlite3')
+    else:
+        config['LOCATION'] = 'benchmark'
+    return {'default': config}
+
+
+def compare(results, baseline, threshold, noise_ms):
+    """Находит сценарии, которые стали медленнее или делают больше
+    запросов, чем в эталонном отчёте."""
+    regressions = []
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        if result['queries'] > old['queries']:
+            regressions.append(
+                f'{key}: запросов {old["queries"]} -> {result["queries"]}'
+            )
+        limit = old['p95_ms'] * (1 + threshold) + noise_ms
+        if result['p95_ms'] > limit:
+            regressions.append(
+                f'{key}: p95 {old["p95_ms"]} -> {result["p95_ms"]} мс'
+            )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет все URL из posts.urls через тестовый клиент на текущих '
+        'данных и измеряет задержку, число SQL-запросов и размер ответа. '
+        'Изменения в базе откатываются, но всё время прогона открыта '
+        'транзакция записи: запускайте на копии базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Сколько раз замерять каждый сценарий.',
+        )
+        parser.add_argument(
+            '--depth',
+            type=int,
+            default=50,
+            help='Номер глубокой страницы для переходов по курсору.',
+        )
+        parser.add_argument(
+            '--only',
+            action='append',
+            default=[],
+            help='Замерять только этот URL (имя из posts.urls).',
+        )
+        parser.add_argument('-o', '--output', help='Файл для JSON-отчёта.')
+        parser.add_argument(
+            '--baseline',
+            help='Эталонный JSON-отчёт для поиска регрессий.',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Допустимый относительный рост p95.',
+        )
+        parser.add_argument(
+            '--noise-ms',
+            type=float,
+            default=1.0,
+            help='Рост p95 в миллисекундах, который считается шумом.',
+        )
+        parser.add_argument(
+            '--yes',
+            action='store_true',
+            help=(
+                'Подтвердить запуск: пока идёт прогон, другие процессы '
+                'не могут писать в базу.'
+            ),
+        )
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Завершаться с ошибкой, если найдены регрессии.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['yes']:
+            raise CommandError(
+                'Бенчмарк держит транзакцию записи до конца прогона, и '
+                'SQLite не пускает других писателей. Запустите его на '
+                'копии базы с --yes.'
+            )
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as file:
+                    baseline = json.load(file)['results']
+            except (OSError, ValueError, KeyError) as error:
+                raise CommandError(f'Не удалось прочитать эталон: {error}')
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            DEBUG=False,
+            ALLOWED_HOSTS=['testserver'],
+            CACHES=get_cache_settings(directory),
+        ):
+            with transaction.atomic():
+                report = self.run(options)
+                transaction.set_rollback(True)
+            cache.clear()
+        # В памяти процесса остались значения с откаченными данными.
+        tiered.clear_l1()
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+        if baseline is None:
+            return
+        regressions = compare(
+            report['results'], baseline,
+            options['threshold'], options['noise_ms'],
+        )
+        for regression in regressions:
+            self.stdout.write(self.style.WARNING(regression))
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
+        elif options['strict']:
+            raise CommandError(f'Найдено регрессий: {len(regressions)}')
+
+    def run(self, options):
+        sample = get_sample()
+        clients = {'guest': Client()}
+        for name in ('reader', 'author'):
+            clients[name] = Client()
+            clients[name].force_login(sample[name])
+
+        results = {}
+        for scenario in get_scenarios(sample, options['depth']):
+            if options['only'] and scenario.name not in options['only']:
+                continue
+            modes = ['warm']
+            if scenario.method == 'get' and scenario.prepare is None:
+                modes.insert(0, 'cold')
+            for mode in modes:
+                key = ':'.join(
+                    [scenario.name, scenario.variant, scenario.client, mode]
+                )
+                results[key] = self.measure(
+                    scenario, clients[scenario.client], mode,
+                    options['iterations'],
+                )
+                self.stdout.write(
+                    '{:<45} p50 {p50_ms:>8} p95 {p95_ms:>8} p99 {p99_ms:>8} '
+                    'мс, запросов {queries:>3}, {bytes:>7} байт'.format(
+                        key, **results[key]
+                    )
+                )
+
+        return {
+            'created': timezone.now().isoformat(),
+            'iterations': options['iterations'],
+            'dataset': {
+                model._meta.label: model.objects.count()
+                for model in (User, Group, Post, Comment, Follow)
+            },
+            'results': results,
+        }
+
+    def measure(self, scenario, client, mode, iterations):
+        request = getattr(client, scenario.method)
+        if mode == 'warm':
+            if scenario.prepare:
+                scenario.prepare()
+            request(scenario.url, scenario.data)
+
+        timings, queries = [], []
+        for _ in range(iterations):
+            if scenario.prepare:
+                scenario.prepare()
+            if mode == 'cold':
+                cache.clear()
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                response = request(scenario.url, scenario.data)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(counter.count)
+
+        result = {
+            f'p{percent}_ms': round(percentile(timings, percent), 3)
+            for percent in PERCENTILES
+        }
+        result.update(
+            mean_ms=round(sum(timings) / len(timings), 3),
+            queries=max(queries),
+            bytes=len(response.content),
+            status=response.status_code,
+        )
+        return result
@@ -0,0 +1,86 @@
+import sys
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает данные в формате dumpdata, записывая объекты в файл '
+        'по мере чтения из базы. Модели идут в порядке зависимостей, '
+        'чтобы fastload вставлял их без ссылок вперёд.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'labels',
+            nargs='*',
+            help='Приложения или модели вида app_label[.ModelName].',
+        )
+        parser.add_argument(
+            '-e', '--exclude',
+            action='append',
+            default=[],
+            help='Приложение или модель, которые не нужно выгружать.',
+        )
+        parser.add_argument(
+            '-o', '--output',
+            help='Файл для выгрузки; по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        models = self.get_models(options['labels'], options['exclude'])
+        chunk_size = options['chunk_size']
+
+        def get_objects():
+            for model in models:
+                yield from model._base_manager.order_by('pk').iterator(
+                    chunk_size=chunk_size
+                )
+
+        if options['output']:
+            stream = open(options['output'], 'w', encoding='utf-8')
+        else:
+            stream = sys.stdout
+        try:
+            serializers.serialize('json', get_objects(), stream=stream)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+    def get_models(self, labels, exclude):
+        try:
+            selected = self.resolve(labels) if labels else [
+                model for config in apps.get_app_configs()
+                for model in config.get_models()
+            ]
+            excluded = set(self.resolve(exclude))
+        except LookupError as error:
+            raise CommandError(error)
+
+        app_list = {}
+        for model in selected:
+            if (
+                model in excluded
+                or model._meta.proxy
+                or not model._meta.managed
+            ):
+                continue
+            app_list.setdefault(model._meta.app_config, []).append(model)
+        return serializers.sort_dependencies(app_list.items())
+
+    def resolve(self, labels):
+        models = []
+        for label in labels:
+            if '.' in label:
+                models.append(apps.get_model(label))
+            else:
+                models.extend(apps.get_app_config(label).get_models())
+        return models
@@ -0,0 +1,132 @@
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.core.serializers.base import DeserializationError
+from django.db import DatabaseError, connection, transaction
+
+from core.bulk import batched, iter_json_array, preserve_auto_dates
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает фикстуру в формате dumpdata, читая JSON потоком '
+        'и сохраняя объекты через bulk_create. Сигналы не отправляются, '
+        'поэтому после загрузки пересчитываются счётчики и ленты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixture', help='Путь к JSON-фикстуре.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько объектов одной модели вставлять за один запрос.',
+        )
+        parser.add_argument(
+            '--commit-every',
+            type=int,
+            default=50000,
+            help='Сколько объектов загружать в одной транзакции.',
+        )
+        parser.add_argument(
+            '--ignore-conflicts',
+            action='store_true',
+            help='Пропускать объекты, которые уже есть в базе.',
+        )
+        parser.add_argument(
+            '--skip-rebuild',
+            action='store_true',
+            help='Не пересчитывать счётчики и ленты после загрузки.',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.ignore_conflicts = options['ignore_conflicts']
+        self.loaded = Counter()
+
+        try:
+            with open(options['fixture'], encoding='utf-8') as stream:
+                objects = serializers.deserialize(
+                    'python', iter_json_array(stream)
+                )
+                with preserve_auto_dates(*apps.get_models()):
+                    self.load(objects, options['commit_every'])
+        except (
+            OSError, ValueError, DeserializationError, DatabaseError
+        ) as error:
+            raise CommandError(f'Не удалось загрузить фикстуру: {error}')
+
+        for model, count in self.loaded.items():
+            self.stdout.write(f'{model._meta.label}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено объектов: {sum(self.loaded.values())}'
+        ))
+
+        if not options['skip_rebuild'] and any(
+            model._meta.app_label == 'posts' for model in self.loaded
+        ):
+            call_command('reconcile_counters', stdout=self.stdout)
+            call_command('rebuild_feeds', stdout=self.stdout)
+
+    def load(self, objects, commit_every):
+        # Ссылки вперёд допустимы: ключи проверяются один раз в конце.
+        with connection.constraint_checks_disabled():
+            for chunk in batched(objects, commit_every):
+                with transaction.atomic():
+                    pending = defaultdict(list)
+                    for obj in chunk:
+                        model = type(obj.object)
+                        pending[model].append(obj)
+                        if len(pending[model]) >= self.batch_size:
+                            self.insert(model, pending.pop(model))
+                    for model, batch in pending.items():
+                        self.insert(model, batch)
+
+        connection.check_constraints(
+            table_names=[model._meta.db_table for model in self.loaded]
+        )
+        sequence_sql = connection.ops.sequence_reset_sql(
+            no_style(), list(self.loaded)
+        )
+        with connection.cursor() as cursor:
+            for line in sequence_sql:
+                cursor.execute(line)
+
+    def insert(self, model, batch):
+        model._base_manager.bulk_create(
+            [obj.object for obj in batch],
+            batch_size=self.batch_size,
+            ignore_conflicts=self.ignore_conflicts,
+        )
+        self.loaded[model] += len(batch)
+
+        relations = defaultdict(list)
+        for obj in batch:
+            for name, values in obj.m2m_data.items():
+                if obj.object.pk is None:
+                    raise CommandError(
+                        f'{model._meta.label} без pk не может '
+                        f'ссылаться на {name}.'
+                    )
+                field = model._meta.get_field(name)
+                through = field.remote_field.through
+                source = through._meta.get_field(
+                    field.m2m_field_name()
+                ).attname
+                target = through._meta.get_field(
+                    field.m2m_reverse_field_name()
+                ).attname
+                relations[through].extend(
+                    through(**{source: obj.object.pk, target: value})
+                    for value in values
+                )
+        for through, rows in relations.items():
+            through._base_manager.bulk_create(
+                rows,
+                batch_size=self.batch_size,
+                ignore_conflicts=self.ignore_conflicts,
+            )
@@ -0,0 +1,84 @@
+import glob
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import get_profile_dir, make_signature
+
+
+def read_stacks(path, stacks):
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+
+
+def merge(directories):
+    """Сумма свёрнутых стеков всех процессов; имя view становится
+    корнем стека."""
+    stacks = Counter()
+    for directory in directories:
+        view_stacks = Counter()
+        for path in glob.glob(os.path.join(directory, '*.folded')):
+            read_stacks(path, view_stacks)
+        view = os.path.basename(directory)
+        for stack, count in view_stacks.items():
+            stacks[f'{view};{stack}'] += count
+    return stacks
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает стеки из PROFILER_DIR в один файл свёрнутых стеков '
+        'для flamegraph.pl, speedscope и подобных инструментов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'views',
+            nargs='*',
+            help='Имена URL, например posts:profile; по умолчанию все.',
+        )
+        parser.add_argument(
+            '-o', '--output',
+            help='Файл результата; по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--sign',
+            action='store_true',
+            help='Напечатать значение заголовка X-Profile и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        if options['sign']:
+            self.stdout.write(make_signature())
+            return
+        if not settings.PROFILER_DIR:
+            raise CommandError('Не задан PROFILER_DIR.')
+
+        if options['views']:
+            directories = [get_profile_dir(view) for view in options['views']]
+        else:
+            directories = sorted(
+                path for path in glob.glob(
+                    os.path.join(settings.PROFILER_DIR, '*')
+                ) if os.path.isdir(path)
+            )
+        stacks = merge(directories)
+        if not stacks:
+            raise CommandError('Стеков не найдено.')
+
+        lines = ''.join(
+            f'{stack} {count}\n' for stack, count in sorted(stacks.items())
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(lines)
+        else:
+            self.stdout.write(lines, ending='')
+        self.stderr.write(
+            f'Стеков: {len(stacks)}, сэмплов: {sum(stacks.values())}'
+        )
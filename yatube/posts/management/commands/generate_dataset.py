@@ -0,0 +1,287 @@
+import argparse
+import random
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from PIL import Image
+
+from core.bulk import batched, preserve_auto_dates
+from posts.models import Comment, Follow, Group, Post, User
+
+
+WORDS = (
+    'сегодня', 'вчера', 'утром', 'вечером', 'город', 'река', 'лес', 'дорога',
+    'книга', 'письмо', 'друг', 'дом', 'окно', 'небо', 'солнце', 'дождь',
+    'снег', 'ветер', 'чай', 'кот', 'собака', 'поезд', 'море', 'работа',
+    'встреча', 'история', 'мысль', 'вопрос', 'ответ', 'новость', 'я',
+    'мы', 'видел', 'читал', 'написал', 'думаю', 'помню', 'хочу', 'очень',
+    'снова', 'тихо', 'долго', 'рядом', 'далеко', 'весной', 'зимой',
+)
+FIRST_NAMES = (
+    'Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Сергей', 'Елена', 'Павел',
+    'Наталья', 'Андрей', 'Дарья', 'Михаил',
+)
+LAST_NAMES = (
+    'Иванов', 'Петров', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов',
+    'Лебедев', 'Козлов', 'Новиков', 'Морозов',
+)
+IMAGE_COUNT = 8
+IMAGE_SIZE = (960, 640)
+
+
+# Фиксированный конец периода: с ним одинаковый --seed даёт одинаковые
+# даты, а не сдвинутые на время запуска.
+DEFAULT_END = '2024-01-01T00:00:00+00:00'
+
+
+def parse_end(value):
+    end = parse_datetime(value)
+    if end is None:
+        raise argparse.ArgumentTypeError(f'Неверная дата: {value}')
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end)
+    return end
+
+
+def next_pk(model):
+    return (model.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками для нагрузочных тестов. Активность '
+        'авторов распределена по степенному закону, одинаковый --seed '
+        'даёт одинаковые данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=1.2,
+            help='Показатель степенного закона для активности авторов.',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько последних дней распределить посты.',
+        )
+        parser.add_argument(
+            '--end',
+            type=parse_end,
+            default=DEFAULT_END,
+            help='Дата последнего поста в формате ISO 8601.',
+        )
+        parser.add_argument(
+            '--group-ratio',
+            type=float,
+            default=0.7,
+            help='Доля постов, привязанных к группе.',
+        )
+        parser.add_argument(
+            '--image-ratio',
+            type=float,
+            default=0.0,
+            help='Доля постов с картинкой.',
+        )
+        parser.add_argument(
+            '--password',
+            help='Пароль всех пользователей; по умолчанию войти нельзя.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Сколько строк вставлять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--skip-rebuild',
+            action='store_true',
+            help='Не пересчитывать счётчики и ленты после генерации.',
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        users, groups = options['users'], options['groups']
+        if options['posts'] and not users:
+            raise CommandError('Для постов нужен хотя бы один пользователь.')
+        if options['follows'] > users * (users - 1):
+            raise CommandError(
+                'Подписок больше, чем возможных пар пользователей.'
+            )
+
+        self.user_ids = range(next_pk(User), next_pk(User) + users)
+        self.group_ids = range(next_pk(Group), next_pk(Group) + groups)
+        self.post_ids = range(next_pk(Post), next_pk(Post) + options['posts'])
+        self.end = options['end']
+        self.span = timedelta(days=options['days'])
+
+        # Авторы с меньшим рангом пишут и собирают подписчиков чаще.
+        self.authors = list(self.user_ids)
+        self.rng.shuffle(self.authors)
+        self.author_weights = list(accumulate(
+            1 / rank ** options['alpha']
+            for rank in range(1, users + 1)
+        ))
+
+        images = self.make_images() if options['image_ratio'] else []
+
+        with preserve_auto_dates(Post, Comment):
+            self.create(User, self.make_users(options['password']))
+            self.create(Group, self.make_groups())
+            self.create(Post, self.make_posts(
+                options['group_ratio'], options['image_ratio'], images
+            ))
+            self.create(Comment, self.make_comments(options['comments']))
+            self.create(Follow, self.make_follows(options['follows']))
+
+        if images:
+            # Картинки общие для многих постов; bulk_create не считает
+            # ссылки на них.
+            call_command(
+                'migrate_media', reconcile=True, skip_thumbnails=True,
+                stdout=self.stdout,
+            )
+        if not options['skip_rebuild']:
+            call_command('reconcile_counters', stdout=self.stdout)
+            call_command('rebuild_feeds', stdout=self.stdout)
+
+    def create(self, model, objects):
+        total = 0
+        for batch in batched(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            total += len(batch)
+        self.stdout.write(f'{model._meta.label}: {total}')
+
+    def text(self, low=5, high=25):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        return ' '.join(words).capitalize()[:200]
+
+    def pick_author(self):
+        return self.rng.choices(
+            self.authors, cum_weights=self.author_weights
+        )[0]
+
+    def post_date(self, post_id):
+        # Даты растут вместе с pk, как у постов, созданных через сайт.
+        share = (post_id - self.post_ids.start + 1) / len(self.post_ids)
+        return self.end - self.span + self.span * share
+
+    def make_images(self):
+        names = []
+        for number in range(IMAGE_COUNT):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            content = BytesIO()
+            Image.new('RGB', IMAGE_SIZE, color).save(content, 'JPEG')
+            names.append(default_storage.save(
+                f'posts/dataset-{number}.jpg', ContentFile(content.getvalue())
+            ))
+        return names
+
+    def make_users(self, password):
+        password = make_password(password) if password else '!'
+        for pk in self.user_ids:
+            yield User(
+                pk=pk,
+                username=f'user{pk}',
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                password=password,
+            )
+
+    def make_groups(self):
+        for pk in self.group_ids:
+            yield Group(
+                pk=pk,
+                title=f'Группа {pk}',
+                slug=f'dataset-{pk}',
+                description=self.text(),
+            )
+
+    def make_posts(self, group_ratio, image_ratio, images):
+        for pk in self.post_ids:
+            pub_date = self.post_date(pk)
+            group_id = None
+            if self.group_ids and self.rng.random() < group_ratio:
+                group_id = self.rng.choice(self.group_ids)
+            image = ''
+            if images and self.rng.random() < image_ratio:
+                image = self.rng.choice(images)
+            yield Post(
+                pk=pk,
+                author_id=self.pick_author(),
+                group_id=group_id,
+                text=self.text(),
+                image=image,
+                pub_date=pub_date,
+                updated_at=pub_date,
+            )
+
+    def make_comments(self, count):
+        if not self.post_ids:
+            return
+        for _ in range(count):
+            post_id = self.rng.choice(self.post_ids)
+            yield Comment(
+                post_id=post_id,
+                author_id=self.rng.choice(self.user_ids),
+                text=self.text(1, 10),
+                # Комментарий появляется в течение суток после поста,
+                # но не позже текущего момента.
+                created=min(self.end, self.post_date(post_id) + timedelta(
+                    seconds=self.rng.randrange(24 * 60 * 60)
+                )),
+            )
+
+    def make_follows(self, count):
+        """Подписки без повторов: каждый читатель получает свою долю
+        count и выбирает столько разных авторов."""
+        users = len(self.user_ids)
+        if not count:
+            return
+        extra = set(self.rng.sample(self.user_ids, count % users))
+        for user_id in self.user_ids:
+            wanted = count // users + (user_id in extra)
+            for author_id in self.pick_followed(user_id, wanted):
+                yield Follow(user_id=user_id, author_id=author_id)
+
+    def pick_followed(self, user_id, count):
+        """count разных авторов, кроме самого пользователя.
+
+        Авторы берутся по степенному закону, пока повторы редки; когда
+        попытки кончаются, недостающие выбираются из оставшихся поровну.
+        """
+        chosen = set()
+        for _ in range(count * 4):
+            if len(chosen) == count:
+                return chosen
+            author_id = self.pick_author()
+            if author_id != user_id:
+                chosen.add(author_id)
+        rest = [
+            author_id for author_id in self.authors
+            if author_id != user_id and author_id not in chosen
+        ]
+        chosen.update(self.rng.sample(rest, count - len(chosen)))
+        return chosen
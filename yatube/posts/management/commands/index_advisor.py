@@ -0,0 +1,126 @@
+import tempfile
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.tiered_cache import tiered
+
+from .benchmark import Scenario, get_cache_settings, get_sample, get_scenarios
+
+
+PROBLEMS = ('USE TEMP B-TREE',)
+# Таблицы, которые читаются целиком намеренно: список групп в форме поста.
+FULL_READS = ('SCAN posts_group',)
+EXPLAINED = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+
+def get_advisor_scenarios(sample):
+    """Сценарии бенчмарка и создание поста, которое раскладывает его
+    по лентам подписчиков."""
+    return get_scenarios(sample, depth=1) + [
+        Scenario(
+            'post_create', 'submit', 'author', 'post',
+            reverse('posts:post_create'), {'text': 'Пост из index_advisor'},
+        ),
+    ]
+
+
+def capture(scenario, client):
+    """SQL, который выполнил view в сценарии, без повторов."""
+    if scenario.prepare:
+        scenario.prepare()
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        getattr(client, scenario.method)(scenario.url, scenario.data)
+    return list(dict.fromkeys(
+        query['sql'] for query in context.captured_queries
+        if query['sql'].lstrip().upper().startswith(EXPLAINED)
+    ))
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def find_problems(plan):
+    problems = []
+    for step in plan:
+        full_scan = (
+            step.startswith('SCAN') and 'INDEX' not in step
+            and step not in FULL_READS
+        )
+        if full_scan or any(problem in step for problem in PROBLEMS):
+            problems.append(step)
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        'Открывает каждый URL из posts.urls тестовым клиентом, показывает '
+        'EXPLAIN QUERY PLAN выполненных запросов и находит полные '
+        'сканирования таблиц и сортировки во временных B-деревьях. '
+        'Изменения в базе откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Завершаться с ошибкой, если найдены проблемы.',
+        )
+        parser.add_argument(
+            '--plans',
+            action='store_true',
+            help='Печатать полный план каждого запроса.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('index_advisor работает только с SQLite.')
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            DEBUG=False,
+            ALLOWED_HOSTS=['testserver'],
+            CACHES=get_cache_settings(directory),
+        ):
+            with transaction.atomic():
+                total = self.run(options)
+                transaction.set_rollback(True)
+            cache.clear()
+        tiered.clear_l1()
+
+        if total and options['strict']:
+            raise CommandError(f'Найдено проблем в планах запросов: {total}')
+
+    def run(self, options):
+        sample = get_sample()
+        clients = {'guest': Client()}
+        for name in ('reader', 'author'):
+            clients[name] = Client()
+            clients[name].force_login(sample[name])
+
+        total = 0
+        for scenario in get_advisor_scenarios(sample):
+            label = f'{scenario.name} ({scenario.variant}, {scenario.client})'
+            for sql in capture(scenario, clients[scenario.client]):
+                plan = explain(sql)
+                problems = find_problems(plan)
+                total += len(problems)
+                if not problems and not options['plans']:
+                    continue
+                style = self.style.WARNING if problems else self.style.SUCCESS
+                self.stdout.write(style(
+                    f'{label}: '
+                    f'{"проблем: " + str(len(problems)) if problems else "OK"}'
+                ))
+                self.stdout.write(f'    {sql}')
+                for step in plan if options['plans'] else problems:
+                    self.stdout.write(f'    {step}')
+            self.stdout.write(f'{label}: проверено')
+        return total
@@ -0,0 +1,158 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.models import StoredFile
+from core.storage import (
+    TracedFileSystemStorage, add_reference, is_content_name,
+)
+from core.tagged_cache import invalidate_tags, touch_tags
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails
+from posts.utils import post_tags
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище по содержимому: копирует '
+        'файл под именем-хешем, создаёт миниатюры и только потом '
+        'переключает посты, так что сайт работает во время переноса. '
+        'Старые файлы остаются, пока не задан --delete-old.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Сколько картинок переносить за один проход.',
+        )
+        parser.add_argument(
+            '--skip-thumbnails',
+            action='store_true',
+            help='Не создавать миниатюры до переключения постов.',
+        )
+        parser.add_argument(
+            '--delete-old',
+            action='store_true',
+            help=(
+                'Удалить перенесённые старые файлы и их миниатюры; '
+                'запускать, когда закэшированные страницы со старыми '
+                'адресами истекут.'
+            ),
+        )
+        parser.add_argument(
+            '--reconcile',
+            action='store_true',
+            help='Пересчитать счётчики ссылок по постам.',
+        )
+
+    def handle(self, *args, **options):
+        self.storage = Post._meta.get_field('image').storage
+        if not hasattr(self.storage, 'get_content_name'):
+            raise CommandError(
+                'DEFAULT_FILE_STORAGE не хранит файлы по содержимому.'
+            )
+
+        moved = missing = 0
+        last_name = ''
+        while True:
+            names = self.get_legacy_names(last_name, options['chunk_size'])
+            if not names:
+                break
+            for name in names:
+                if self.migrate(name, options):
+                    moved += 1
+                else:
+                    missing += 1
+            last_name = names[-1]
+
+        if options['reconcile']:
+            self.reconcile()
+        deleted = self.delete_old() if options['delete_old'] else 0
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено картинок: {moved}, не найдено файлов: {missing}, '
+            f'удалено старых: {deleted}'
+        ))
+
+    def get_legacy_names(self, after, limit):
+        names = []
+        queryset = Post.objects.order_by('image').values_list(
+            'image', flat=True
+        ).distinct()
+        # Имена по содержимому пропускаются пачками, пока не наберётся
+        # limit старых.
+        while len(names) < limit:
+            batch = list(queryset.filter(image__gt=after)[:limit])
+            if not batch:
+                break
+            names += [name for name in batch if not is_content_name(name)]
+            after = batch[-1]
+        return names
+
+    def migrate(self, name, options):
+        if not self.storage.exists(name):
+            self.stderr.write(f'{name}: файл не найден')
+            return False
+
+        with self.storage.open(name) as file:
+            new_name = self.storage.get_content_name(name, file)
+            if not self.storage.exists(new_name):
+                self.storage.write(new_name, file)
+        if not options['skip_thumbnails']:
+            generate_thumbnails(new_name)
+
+        posts = Post.objects.filter(image=name).select_related('group')
+        tags = {tag for post in posts for tag in post_tags(post)}
+        with transaction.atomic():
+            # Новое updated_at сбрасывает карточки постов в кэше.
+            count = Post.objects.filter(image=name).update(
+                image=new_name, updated_at=timezone.now()
+            )
+            if count:
+                add_reference(new_name, count)
+                # Пока делались миниатюры, последний пост с той же
+                # картинкой мог её отпустить, и файл удалился.
+                if not self.storage.exists(new_name):
+                    with self.storage.open(name) as file:
+                        self.storage.write(new_name, file)
+        if tags:
+            invalidate_tags(*tags)
+            touch_tags('feed:index')
+        return True
+
+    def delete_old(self):
+        """Удаляет файлы из плоского каталога upload_to, на которые
+        больше не ссылается ни один пост."""
+        directory = Post._meta.get_field('image').upload_to.rstrip('/')
+        if not self.storage.exists(directory):
+            return 0
+        deleted = 0
+        _, files = self.storage.listdir(directory)
+        for filename in files:
+            name = f'{directory}/{filename}'
+            if is_content_name(name) or name.endswith('.tmp'):
+                continue
+            if Post.objects.filter(image=name).exists():
+                continue
+            default.kvstore.delete(ImageFile(name))
+            # Старые файлы не учтены в счётчиках, поэтому удаляются
+            # мимо них.
+            TracedFileSystemStorage.delete(self.storage, name)
+            deleted += 1
+        return deleted
+
+    def reconcile(self):
+        counts = Post.objects.exclude(image='').values('image').annotate(
+            refs=Count('pk')
+        ).values_list('image', 'refs')
+        with transaction.atomic():
+            for name, refs in counts:
+                if is_content_name(name):
+                    StoredFile.objects.update_or_create(
+                        name=name, defaults={'refs': refs}
+                    )
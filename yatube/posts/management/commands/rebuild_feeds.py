@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from posts.feed import rebuild_feeds
+from posts.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает ленты подписок всех пользователей. Лента каждого '
+        'пользователя заменяется в одной транзакции и во время пересборки '
+        'не пустеет.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Сколько лент пересобирать в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        # Ленты тех, кто уже ни на кого не подписан, тоже пересобираются,
+        # то есть очищаются.
+        user_ids = sorted({
+            *Follow.objects.order_by().values_list(
+                'user_id', flat=True
+            ).distinct(),
+            *FeedEntry.objects.order_by().values_list(
+                'user_id', flat=True
+            ).distinct(),
+        })
+
+        total = 0
+        for start in range(0, len(user_ids), chunk_size):
+            total += rebuild_feeds(user_ids[start:start + chunk_size])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано лент: {len(user_ids)}, записей: {total}'
+        ))
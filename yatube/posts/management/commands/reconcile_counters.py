@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_comments, reconcile_users
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько записей пересчитывать за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        users = self.reconcile(User.objects.all(), reconcile_users, chunk_size)
+        posts = self.reconcile(
+            Post.objects.all(), reconcile_comments, chunk_size
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано пользователей: {users}, постов: {posts}'
+        ))
+
+    def reconcile(self, queryset, reconcile_chunk, chunk_size):
+        total = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', flat=True
+                )[:chunk_size]
+            )
+            if not pks:
+                return total
+            reconcile_chunk(pks)
+            total += len(pks)
+            last_pk = pks[-1]
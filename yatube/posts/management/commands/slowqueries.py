@@ -0,0 +1,143 @@
+import glob
+import json
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+SORT_KEYS = ('total', 'count', 'mean', 'max')
+TOP = 3
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDERS = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+SPACES = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """Форма запроса: литералы и параметры заменены на ?, списки
+    в IN (...) свёрнуты, пробелы схлопнуты."""
+    shape = STRING.sub('?', sql)
+    shape = NUMBER.sub('?', shape)
+    shape = shape.replace('%s', '?')
+    shape = PLACEHOLDERS.sub('(...)', shape)
+    return SPACES.sub(' ', shape).strip()
+
+
+def read_entries(path):
+    """Записи журнала вместе с ротированными файлами path.1, path.2..."""
+    paths = sorted(glob.glob(glob.escape(path) + '.*'), reverse=True)
+    paths.append(path)
+    for log_path in paths:
+        try:
+            with open(log_path, encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            continue
+
+
+def format_template(template):
+    if not template:
+        return None
+    return f'{template["name"]}:{template["line"]}'
+
+
+def aggregate(entries):
+    shapes = {}
+    for entry in entries:
+        shape = normalize(entry['sql'])
+        stats = shapes.get(shape)
+        if stats is None:
+            stats = shapes[shape] = {
+                'shape': shape,
+                'count': 0,
+                'total': 0.0,
+                'max': 0.0,
+                'views': Counter(),
+                'templates': Counter(),
+                'plan': None,
+            }
+        duration = entry['duration_ms']
+        stats['count'] += 1
+        stats['total'] += duration
+        if duration >= stats['max']:
+            stats['max'] = duration
+            stats['plan'] = entry.get('plan')
+        stats['views'][entry.get('view')] += 1
+        stats['templates'][format_template(entry.get('template'))] += 1
+    for stats in shapes.values():
+        stats['mean'] = stats['total'] / stats['count']
+    return shapes
+
+
+def format_top(counter):
+    return ', '.join(
+        f'{name} ({count})'
+        for name, count in counter.most_common(TOP) if name
+    ) or '-'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка журнала медленных запросов SLOW_QUERY_LOG по формам '
+        'запросов: число, суммарное, среднее и максимальное время, '
+        'view и строки шаблонов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            help='Журнал; по умолчанию SLOW_QUERY_LOG.',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Сколько форм запросов показать.',
+        )
+        parser.add_argument(
+            '--sort',
+            choices=SORT_KEYS,
+            default='total',
+            help='Порядок сортировки.',
+        )
+        parser.add_argument(
+            '--plans',
+            action='store_true',
+            help='Печатать план самого медленного запроса каждой формы.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.SLOW_QUERY_LOG
+        if not path:
+            raise CommandError('Не задан журнал: --path или SLOW_QUERY_LOG.')
+
+        shapes = aggregate(read_entries(path))
+        if not shapes:
+            self.stdout.write('Медленных запросов нет.')
+            return
+
+        ordered = sorted(
+            shapes.values(), key=lambda stats: stats[options['sort']],
+            reverse=True,
+        )
+        for stats in ordered[:options['limit']]:
+            self.stdout.write(self.style.WARNING(
+                f'{stats["count"]} раз, всего {stats["total"]:.1f} мс, '
+                f'в среднем {stats["mean"]:.1f} мс, '
+                f'максимум {stats["max"]:.1f} мс'
+            ))
+            self.stdout.write(f'    {stats["shape"]}')
+            self.stdout.write(f'    view: {format_top(stats["views"])}')
+            self.stdout.write(
+                f'    шаблоны: {format_top(stats["templates"])}'
+            )
+            if options['plans'] and stats['plan']:
+                for step in stats['plan']:
+                    self.stdout.write(f'        {step}')
@@ -0,0 +1,112 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.bulk import batched
+from core.tagged_cache import invalidate_tags, touch_tags
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails, get_placeholder_color
+from posts.utils import post_tags
+
+
+def warm(name, force):
+    """Задача процесса пула: (картинка, создано миниатюр, цвет
+    заглушки, ошибка)."""
+    try:
+        if force:
+            default.kvstore.delete(ImageFile(name))
+        with default_storage.open(name) as file, Image.open(file) as image:
+            color = get_placeholder_color(image)
+        return name, generate_thumbnails(name), color, None
+    except Exception as error:
+        return name, 0, None, f'{type(error).__name__}: {error}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт миниатюры всех размеров из шаблонов для картинок постов '
+        'в пуле процессов и заполняет цвет заглушки постов. Уже созданные '
+        'миниатюры пропускаются, если не задан --force.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count(),
+            help=(
+                'Число процессов; по умолчанию по числу ядер, '
+                '0 -- без пула, в текущем процессе.'
+            ),
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=20,
+            help='Сколько картинок отдавать процессу за раз.',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать миниатюры, удалив старые.',
+        )
+
+    def handle(self, *args, **options):
+        names = list(
+            Post.objects.exclude(image='').exclude(image=None).order_by(
+                'image'
+            ).values_list('image', flat=True).distinct()
+        )
+        forces = [options['force']] * len(names)
+        if options['processes']:
+            # Дочерние процессы не должны делить соединение родителя.
+            connections.close_all()
+            with ProcessPoolExecutor(options['processes']) as pool:
+                results = list(pool.map(
+                    warm, names, forces, chunksize=options['chunk_size'],
+                ))
+        else:
+            results = list(map(warm, names, forces))
+
+        created = 0
+        changed = []
+        for name, count, color, error in results:
+            if error:
+                self.stderr.write(f'{name}: {error}')
+                continue
+            # Цвет заглушки для постов, загруженных до его появления;
+            # новое updated_at сбрасывает их карточки в кэше.
+            colored = Post.objects.filter(
+                image=name, placeholder_color=''
+            ).update(placeholder_color=color, updated_at=timezone.now())
+            created += count
+            if count or colored:
+                changed.append(name)
+        self.invalidate(changed)
+
+        errors = sum(1 for *_, error in results if error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок: {len(names)}, создано миниатюр: {created}, '
+            f'ошибок: {errors}'
+        ))
+
+    def invalidate(self, names):
+        """Сбрасывает страницы, которые показывали заглушку."""
+        if not names:
+            return
+        tags = set()
+        for batch in batched(names, 500):
+            posts = Post.objects.filter(image__in=batch).select_related(
+                'group'
+            )
+            for post in posts:
+                tags.update(post_tags(post))
+        invalidate_tags(*tags)
+        touch_tags('feed:index')
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+
+FORWARD = [
+    # Внешнее содержимое: текст хранится только в posts_post, а автор
+    # и группа индексируются, чтобы фильтры шли внутри FTS5.
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "text, author_id, group_id, content='posts_post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts (rowid, text, author_id, group_id) "
+    "VALUES (new.id, new.text, new.author_id, new.group_id); END",
+    "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts "
+    "(posts_post_fts, rowid, text, author_id, group_id) "
+    "VALUES ('delete', old.id, old.text, old.author_id, old.group_id); END",
+    "CREATE TRIGGER posts_post_fts_update "
+    "AFTER UPDATE OF text, author_id, group_id ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts "
+    "(posts_post_fts, rowid, text, author_id, group_id) "
+    "VALUES ('delete', old.id, old.text, old.author_id, old.group_id); "
+    "INSERT INTO posts_post_fts (rowid, text, author_id, group_id) "
+    "VALUES (new.id, new.text, new.author_id, new.group_id); END",
+    "INSERT INTO posts_post_fts (posts_post_fts) VALUES ('rebuild')",
+]
+
+BACKWARD = [
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    'DROP TABLE IF EXISTS posts_post_fts',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(FORWARD), run(BACKWARD)),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-17 08:10
+
+from django.db import migrations, models
+
+from posts.search import create_triggers
+
+
+def restore_triggers(apps, schema_editor):
+    # SQLite добавляет поле, пересоздавая posts_post.
+    create_triggers(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_triggers),
+        migrations.AddField(
+            model_name='post',
+            name='placeholder_color',
+            field=models.CharField(blank=True, editable=False, help_text='Средний цвет картинки, пока она загружается', max_length=7, verbose_name='Цвет заглушки'),
+        ),
+        migrations.RunPython(restore_triggers, migrations.RunPython.noop),
+    ]
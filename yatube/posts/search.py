@@ -0,0 +1,162 @@
+import re
+from collections import namedtuple
+
+from django.core import signing
+from django.db import connection
+
+from .models import Post
+
+
+FTS_TABLE = 'posts_post_fts'
+SEARCH_CANDIDATES = 500
+SEARCH_SALT = 'posts.search.cursor'
+MAX_TERMS = 8
+
+WORD = re.compile(r'\w+')
+
+SearchPage = namedtuple('SearchPage', 'posts next_cursor')
+
+# Триггеры, которые держат индекс поиска в согласии с posts_post.
+TRIGGERS = {
+    'posts_post_fts_insert': (
+        'CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post '
+        'BEGIN '
+        'INSERT INTO posts_post_fts (rowid, text, author_id, group_id) '
+        'VALUES (new.id, new.text, new.author_id, new.group_id); END'
+    ),
+    'posts_post_fts_delete': (
+        'CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post '
+        'BEGIN '
+        'INSERT INTO posts_post_fts '
+        '(posts_post_fts, rowid, text, author_id, group_id) '
+        "VALUES ('delete', old.id, old.text, old.author_id, old.group_id); "
+        'END'
+    ),
+    'posts_post_fts_update': (
+        'CREATE TRIGGER posts_post_fts_update '
+        'AFTER UPDATE OF text, author_id, group_id ON posts_post BEGIN '
+        'INSERT INTO posts_post_fts '
+        '(posts_post_fts, rowid, text, author_id, group_id) '
+        "VALUES ('delete', old.id, old.text, old.author_id, old.group_id); "
+        'INSERT INTO posts_post_fts (rowid, text, author_id, group_id) '
+        'VALUES (new.id, new.text, new.author_id, new.group_id); END'
+    ),
+}
+
+
+def get_missing_triggers(connection):
+    """Триггеры индекса, которых нет в базе; пустой список, если
+    индекса нет совсем."""
+    if connection.vendor != 'sqlite':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master "
+            "WHERE type IN ('table', 'trigger') AND name LIKE %s",
+            [FTS_TABLE + '%'],
+        )
+        found = cursor.fetchall()
+    if ('table', FTS_TABLE) not in found:
+        return []
+    return [name for name in TRIGGERS if ('trigger', name) not in found]
+
+
+def create_triggers(connection):
+    """Пересоздаёт триггеры индекса поиска.
+
+    SQLite пересоздаёт posts_post при изменении её полей, и триггеры
+    пропадают вместе со старой таблицей; содержимое индекса остаётся
+    верным, потому что id постов не меняются.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, statement in TRIGGERS.items():
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(statement)
+
+
+def get_terms(query):
+    return list(dict.fromkeys(WORD.findall(query.lower())))[:MAX_TERMS]
+
+
+def build_match(terms, author_id=None, group_id=None):
+    """Запрос FTS5: все слова в тексте и, если заданы, автор и группа.
+
+    Слова берутся в кавычки, поэтому операторы FTS5 во вводе
+    пользователя не действуют.
+    """
+    phrases = ' '.join(f'"{term}"' for term in terms)
+    parts = [f'text : ({phrases})']
+    if author_id is not None:
+        parts.append(f'author_id : "{int(author_id)}"')
+    if group_id is not None:
+        parts.append(f'group_id : "{int(group_id)}"')
+    return ' AND '.join(parts)
+
+
+def get_candidates(match, before=None, limit=SEARCH_CANDIDATES):
+    """Окно из limit самых новых подходящих постов с id меньше before.
+
+    Возвращает пары (оценка, id) от лучших к худшим и id, с которого
+    начнётся следующее окно, или None, если окно последнее. Оценка --
+    bm25 из FTS5 только по тексту: чем меньше, тем выше пост.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT bm25({FTS_TABLE}, 1.0, 0.0, 0.0), rowid '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid < %s '
+            f'ORDER BY rowid DESC LIMIT %s',
+            [match, before or 2 ** 63 - 1, limit],
+        )
+        scored = cursor.fetchall()
+    # Окно уже ограничено limit, и сортировать его дешевле здесь, чем
+    # временным деревом в SQLite.
+    scored.sort(key=lambda item: (item[0], -item[1]))
+    if len(scored) < limit:
+        return scored, None
+    return scored, min(pk for _, pk in scored)
+
+
+def load_cursor(cursor):
+    """Окно и последний показанный пост из курсора страницы."""
+    try:
+        before, score, pk = signing.loads(cursor, salt=SEARCH_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None, None
+    return before, (score, -pk)
+
+
+def search_posts(query, per_page, author_id=None, group_id=None, cursor=None):
+    """Страница результатов поиска по тексту постов.
+
+    Подходящие посты делятся на окна по SEARCH_CANDIDATES от новых к
+    старым, и внутри окна упорядочены по bm25: так время запроса не
+    зависит ни от размера таблицы, ни от частоты слов, а курсор
+    (окно, оценка, id) доходит до самых старых постов.
+    """
+    terms = get_terms(query)
+    if not terms:
+        return SearchPage([], None)
+
+    match = build_match(terms, author_id, group_id)
+    before, after = load_cursor(cursor) if cursor else (None, None)
+    page = []
+    while len(page) <= per_page:
+        scored, older = get_candidates(match, before, SEARCH_CANDIDATES)
+        page.extend(
+            (before, score, pk) for score, pk in scored
+            if after is None or (score, -pk) > after
+        )
+        if older is None:
+            break
+        before, after = older, None
+
+    next_cursor = None
+    if len(page) > per_page:
+        next_cursor = signing.dumps(page[per_page - 1], salt=SEARCH_SALT)
+    page = page[:per_page]
+    posts = Post.objects.for_feed().in_bulk([pk for _, _, pk in page])
+    return SearchPage(
+        [posts[pk] for _, _, pk in page if pk in posts], next_cursor
+    )
@@ -0,0 +1,151 @@
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models.signals import (
+    post_delete, post_init, post_migrate, post_save, pre_save,
+)
+from django.dispatch import receiver
+
+from core.tagged_cache import invalidate_tags_on_commit, touch_tags
+
+from . import counters, feed
+from .models import Comment, Follow, Group, Post, User
+from .search import create_triggers, get_missing_triggers
+from .thumbnails import schedule_thumbnails
+from .utils import GROUP_ID_KEY, USER_ID_KEY, post_tags
+
+
+def release_image(name):
+    """Отпускает ссылку на файл картинки после коммита."""
+    if name:
+        storage = Post._meta.get_field('image').storage
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # Имя сохранённой картинки, чтобы после замены отпустить старую.
+    # У загруженного файла имени в хранилище ещё нет, а для
+    # отложенного поля оно неизвестно.
+    image = instance.__dict__.get('image')
+    instance._stored_image = image if isinstance(image, str) else None
+    # Группа до правки: пост, перенесённый в другую группу, меняет
+    # и страницу прежней.
+    instance._stored_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    # Загрузка сохранится в хранилище и добавит ссылку на файл, даже
+    # если его содержимое совпадает с прежней картинкой.
+    instance._uploading_image = (
+        not raw and 'image' in instance.__dict__
+        and bool(instance.image) and not instance.image._committed
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    replaced = (
+        instance._uploading_image
+        or instance._stored_image != instance.image
+    )
+    if instance._stored_image and replaced:
+        release_image(instance._stored_image)
+    if 'image' in instance.__dict__:
+        instance._stored_image = instance.image.name
+    tags = post_tags(instance)
+    if instance._stored_group_id not in (None, instance.group_id):
+        tags.append(f'group:{instance._stored_group_id}')
+    if 'group_id' in instance.__dict__:
+        instance._stored_group_id = instance.group_id
+    if created:
+        counters.change_stats(instance.author_id, posts_count=1)
+        feed.fan_out_post(instance)
+        invalidate_tags_on_commit('feed:index', *tags)
+    else:
+        invalidate_tags_on_commit(*tags)
+        # Правка поста меняет index, но кэш его страницы уже сброшен
+        # тегом поста, поэтому обновляется только время изменения.
+        transaction.on_commit(lambda: touch_tags('feed:index'))
+    schedule_thumbnails(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    if 'image' in instance.__dict__:
+        release_image(instance.image.name)
+    counters.change_stats(instance.author_id, posts_count=-1)
+    invalidate_tags_on_commit('feed:index', *post_tags(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_comments_count(instance.post_id, 1)
+    invalidate_tags_on_commit(f'post:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+    invalidate_tags_on_commit(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_stats(instance.author_id, followers_count=1)
+        counters.change_stats(instance.user_id, following_count=1)
+        feed.backfill_feed(instance.user_id, instance.author_id)
+    invalidate_tags_on_commit(
+        f'author:{instance.author_id}', f'author:{instance.user_id}'
+    )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_stats(instance.author_id, followers_count=-1)
+    counters.change_stats(instance.user_id, following_count=-1)
+    feed.prune_feed(instance.user_id, instance.author_id)
+    invalidate_tags_on_commit(
+        f'author:{instance.author_id}', f'author:{instance.user_id}'
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    invalidate_tags_on_commit(
+        'feed:index', f'group:{instance.pk}', f'group_info:{instance.pk}'
+    )
+    # Slug мог перейти к этой группе от другой.
+    cache.delete(GROUP_ID_KEY.format(instance.slug))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields == frozenset({'last_login'}):
+        return
+    invalidate_tags_on_commit(f'author:{instance.pk}', f'user:{instance.pk}')
+    # Имя могло перейти к другому пользователю.
+    cache.delete(USER_ID_KEY.format(instance.username))
+    if not created:
+        # Имя автора видно в index и в группах, где он писал. Кэш этих
+        # страниц уже сброшен тегом user:, а ETag нужно новое время.
+        group_ids = list(
+            Post.objects.filter(author=instance, group__isnull=False)
+            .order_by().values_list('group_id', flat=True).distinct()
+        )
+        tags = ['feed:index', *(f'group:{pk}' for pk in group_ids)]
+        transaction.on_commit(lambda: touch_tags(*tags))
+
+
+@receiver(post_migrate)
+def search_triggers_checked(sender, using, **kwargs):
+    # Миграция, которая меняет поля posts_post, теряет триггеры поиска,
+    # если сама их не восстановила.
+    connection = connections[using]
+    if sender.name == 'posts' and get_missing_triggers(connection):
+        create_triggers(connection)
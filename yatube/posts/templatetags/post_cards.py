@@ -0,0 +1,84 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.tagged_cache import get_tag_versions
+
+from ..thumbnails import get_ready_thumbnails
+
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/post_data.html'
+
+
+def get_card_tags(post):
+    """Теги полей автора и группы, которые показывает карточка.
+
+    Теги страниц author: и group: меняются с каждым новым постом
+    и подпиской, поэтому карточки на них не завязаны.
+    """
+    tags = [f'user:{post.author_id}']
+    if post.group_id:
+        tags.append(f'group_info:{post.group_id}')
+    return tags
+
+
+def get_card_key(post, versions, show_profile_posts, show_group_list):
+    return 'post_card:{}:{}:{}:{:d}{:d}'.format(
+        post.pk,
+        post.updated_at.timestamp(),
+        '-'.join(str(versions[tag]) for tag in get_card_tags(post)),
+        bool(show_profile_posts),
+        bool(show_group_list),
+    )
+
+
+@register.simple_tag
+def post_cards(posts, show_profile_posts=False, show_group_list=False):
+    """Возвращает HTML карточек постов, беря готовые из кэша.
+
+    Ключ карточки меняется с правкой поста, профиля его автора и его
+    группы.
+
+    Миниатюры для недостающих карточек ищутся одним запросом к
+    хранилищу ключей sorl-thumbnail на всю страницу.
+    """
+    versions = get_tag_versions(
+        {tag for post in posts for tag in get_card_tags(post)}
+    )
+    keys = [
+        get_card_key(post, versions, show_profile_posts, show_group_list)
+        for post in posts
+    ]
+    cards = cache.get_many(keys)
+
+    pending = [
+        (key, post) for key, post in zip(keys, posts) if key not in cards
+    ]
+    pictures = get_ready_thumbnails(
+        [post.image for _, post in pending], 'card'
+    )
+
+    missed = {}
+    for (key, post), picture in zip(pending, pictures):
+        card = render_to_string(CARD_TEMPLATE, {
+            'post': post,
+            'picture': picture,
+            'show_profile_posts': show_profile_posts,
+            'show_group_list': show_group_list,
+        })
+        if post.image and picture is None:
+            # Карточка с заглушкой не кэшируется, чтобы картинка
+            # появилась, как только миниатюры будут готовы. Их создают
+            # сохранение поста и warm_thumbnails, а не чтение.
+            cards[key] = card
+        else:
+            missed[key] = card
+    if missed:
+        cache.set_many(missed, settings.POST_CARD_CACHE_TIMEOUT)
+        cards.update(missed)
+
+    return [mark_safe(cards[key]) for key in keys]
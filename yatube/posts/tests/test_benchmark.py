@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from ..management.commands.benchmark import compare, percentile
+from ..models import Post, Group, User, Comment, Follow
+from ..urls import urlpatterns
+
+
+class BenchmarkTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(25):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def benchmark(self, **options):
+        call_command(
+            'benchmark', iterations=2, depth=1, yes=True, stdout=StringIO(),
+            **options
+        )
+
+    def test_percentile(self):
+        """Перцентиль считается по ближайшему рангу."""
+
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_report_covers_all_urls(self):
+        """Отчёт содержит каждый URL из posts.urls, а база не меняется."""
+
+        comments = Comment.objects.count()
+        follows = Follow.objects.count()
+
+        self.benchmark(output=self.path)
+
+        with open(self.path, encoding='utf-8') as file:
+            results = json.load(file)['results']
+        measured = {key.split(':')[0] for key in results}
+        self.assertEqual(
+            measured, {pattern.name for pattern in urlpatterns}
+        )
+        self.assertIn('index:deep:guest:cold', results)
+        self.assertEqual(results['index:first:guest:warm']['queries'], 0)
+        self.assertEqual(Comment.objects.count(), comments)
+        self.assertEqual(Follow.objects.count(), follows)
+
+    def test_compare_with_baseline(self):
+        """Рост p95 сверх порога и новые запросы считаются регрессией."""
+
+        baseline = {
+            'a': {'p95_ms': 10.0, 'queries': 2},
+            'b': {'p95_ms': 10.0, 'queries': 2},
+            'c': {'p95_ms': 10.0, 'queries': 2},
+        }
+        results = {
+            'a': {'p95_ms': 12.5, 'queries': 2},
+            'b': {'p95_ms': 14.0, 'queries': 2},
+            'c': {'p95_ms': 5.0, 'queries': 3},
+            'd': {'p95_ms': 100.0, 'queries': 9},
+        }
+        regressions = compare(results, baseline, threshold=0.2, noise_ms=1)
+        self.assertEqual(
+            [regression.split(':')[0] for regression in regressions],
+            ['b', 'c'],
+        )
+
+    def test_strict_fails_on_regression(self):
+        """С --strict регрессия относительно эталона — ошибка."""
+
+        with open(self.path, 'w', encoding='utf-8') as file:
+            json.dump({'results': {
+                'index:first:guest:cold': {'p95_ms': 1000.0, 'queries': 0},
+            }}, file)
+
+        with self.assertRaises(CommandError):
+            self.benchmark(only=['index'], baseline=self.path, strict=True)
+
+    def test_requires_confirmation(self):
+        """Без --yes бенчмарк не запускается."""
+
+        with self.assertRaises(CommandError):
+            call_command('benchmark', stdout=StringIO())
+
+    def test_site_cache_untouched(self):
+        """Бенчмарк не трогает кэш сайта."""
+
+        cache.set('site-key', 'value')
+
+        self.benchmark(only=['index'])
+
+        self.assertEqual(cache.get('site-key'), 'value')
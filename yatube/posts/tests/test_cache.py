@@ -1,8 +1,14 @@
+from unittest import mock
+
 from django.urls import reverse
 from django.core.cache import cache
+from django.shortcuts import render
 from django.test import TestCase, Client
 
-from ..models import Post, User
+from core.tagged_cache import invalidate_tags
+
+from ..models import Post, Group, User, Comment
+from .utils import execute_on_commit
 
 
 class CacheTests(TestCase):
@@ -12,28 +18,169 @@ class CacheTests(TestCase):
         super().setUpClass()
 
         cls.author = User.objects.create_user(username='NoName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Закэшированный пост',
+            author=cls.author,
+            group=cls.group,
+        )
         cls.INDEX = reverse('posts:index')
+        cls.GROUP = reverse('posts:group_list', args=[cls.group.slug])
+        cls.PROFILE = reverse('posts:profile', args=[cls.author.username])
+        cls.POST_DETAIL = reverse('posts:post_detail', args=[cls.post.pk])
 
     def setUp(self):
         cache.clear()
 
         self.test_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(CacheTests.author)
 
     def test_index_cache(self):
-        """Тестирование кэширования страницы index."""
+        """Страница index отдаётся из кэша, пока ничего не изменилось."""
+
+        response_before = self.test_client.get(CacheTests.INDEX)
+
+        with self.assertNumQueries(0):
+            response_cached = self.test_client.get(CacheTests.INDEX)
+
+        self.assertEqual(response_before.content, response_cached.content)
+
+    def test_page_changed_while_rendering_not_cached(self):
+        """Страница, данные которой изменились во время рендера,
+        не сохраняется в кэш под новой версией тегов."""
+
+        def render_during_write(*args, **kwargs):
+            invalidate_tags(f'post:{CacheTests.post.pk}')
+            return render(*args, **kwargs)
+
+        with mock.patch('posts.views.render', render_during_write):
+            self.test_client.get(CacheTests.INDEX)
+
+        response = self.test_client.get(CacheTests.INDEX)
+        self.assertIsNotNone(response.context)
+
+    def test_page_cached_before_commit_invalidated(self):
+        """Страница, закэшированная до коммита записи, сбрасывается
+        после него."""
+
+        with execute_on_commit():
+            Comment.objects.create(
+                post=CacheTests.post,
+                author=CacheTests.author,
+                text='Комментарий',
+            )
+            self.test_client.get(CacheTests.POST_DETAIL)
+
+        response = self.test_client.get(CacheTests.POST_DETAIL)
+        self.assertIsNotNone(response.context)
+
+    def test_author_rename_invalidates_lists(self):
+        """Новое имя автора сразу видно в лентах, где есть его посты."""
+
+        urls = [CacheTests.INDEX, CacheTests.GROUP]
+        for url in urls:
+            self.test_client.get(url)
+
+        CacheTests.author.first_name = 'Переименованный'
+        CacheTests.author.save()
+
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.test_client.get(url), 'Переименованный'
+                )
+
+    def test_group_slug_change_drops_old_page(self):
+        """После смены slug страница по старому адресу не отдаётся
+        из кэша."""
+
+        group = Group.objects.create(title='Временная', slug='old-slug')
+        url = reverse('posts:group_list', args=['old-slug'])
+        self.assertEqual(self.test_client.get(url).status_code, 200)
+
+        group.slug = 'new-slug'
+        group.save()
+
+        self.assertEqual(self.test_client.get(url).status_code, 404)
+
+    def test_new_post_invalidates_pages(self):
+        """Новый пост сразу виден на кэшированных страницах."""
+
+        urls = [CacheTests.INDEX, CacheTests.GROUP, CacheTests.PROFILE]
+        for url in urls:
+            self.test_client.get(url)
+
+        Post.objects.create(
+            text='Свежий пост',
+            author=CacheTests.author,
+            group=CacheTests.group,
+        )
+
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.test_client.get(url)
+                self.assertContains(response, 'Свежий пост')
+
+    def test_deleted_post_disappears_from_index(self):
+        """Удалённый пост пропадает из кэшированной страницы index."""
 
         post = Post.objects.create(
             text='Тест кэша.',
             author=CacheTests.author
         )
 
-        response_before_delete = self.test_client.get(CacheTests.INDEX)
+        self.assertContains(self.test_client.get(CacheTests.INDEX), post.text)
 
         Post.objects.filter(id=post.id).delete()
 
-        response_after_delete = self.test_client.get(CacheTests.INDEX)
+        self.assertNotContains(
+            self.test_client.get(CacheTests.INDEX), post.text
+        )
+
+    def test_comment_invalidates_post_detail(self):
+        """Новый комментарий сразу виден на странице поста."""
+
+        self.test_client.get(CacheTests.POST_DETAIL)
+
+        Comment.objects.create(
+            post=CacheTests.post,
+            author=CacheTests.author,
+            text='Свежий комментарий',
+        )
+
+        self.assertContains(
+            self.test_client.get(CacheTests.POST_DETAIL), 'Свежий комментарий'
+        )
+
+    def test_authorized_pages_not_cached(self):
+        """Авторизованный пользователь всегда получает свежую страницу."""
+
+        response = self.author_client.get(CacheTests.INDEX)
+        self.assertIsNotNone(response.context)
+
+        response = self.author_client.get(CacheTests.INDEX)
+        self.assertIsNotNone(response.context)
+
+    def test_post_detail_bundle_cached(self):
+        """Авторизованная страница поста берёт пост и комментарии из кэша,
+        пока пост не изменён и не прокомментирован."""
+
+        self.author_client.get(CacheTests.POST_DETAIL)
+
+        with self.assertNumQueries(2):
+            self.author_client.get(CacheTests.POST_DETAIL)
+
+        self.author_client.post(
+            reverse('posts:add_comment', args=[CacheTests.post.pk]),
+            {'text': 'Комментарий автора'},
+        )
 
-        self.assertEqual(
-            response_before_delete.content,
-            response_after_delete.content
+        self.assertContains(
+            self.author_client.get(CacheTests.POST_DETAIL),
+            'Комментарий автора'
         )
@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Post, User, Comment
+from ..utils import SORT_COMMENT
+
+
+POST_DETAIL_URL = 'posts:post_detail'
+POST_COMMENTS_URL = 'posts:post_comments'
+
+
+class CommentsPaginationTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+        for i in range(SORT_COMMENT + 5):
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f'Комментарий {i}'
+            )
+
+        cls.comments_list = list(
+            Comment.objects.filter(post=cls.post).order_by('-created', '-pk')
+        )
+
+    def setUp(self):
+        cache.clear()
+
+        self.test_client = Client()
+
+    def test_post_detail_shows_first_page(self):
+        """Страница поста показывает только первую порцию комментариев."""
+
+        response = self.test_client.get(
+            reverse(POST_DETAIL_URL, args=[CommentsPaginationTests.post.pk])
+        )
+
+        self.assertEqual(
+            list(response.context['comments']),
+            CommentsPaginationTests.comments_list[:SORT_COMMENT]
+        )
+        self.assertIsNotNone(response.context['next_cursor'])
+
+    def test_load_more_returns_next_batch(self):
+        """Фрагмент «показать ещё» отдаёт следующую порцию комментариев."""
+
+        response = self.test_client.get(
+            reverse(POST_DETAIL_URL, args=[CommentsPaginationTests.post.pk])
+        )
+
+        fragment = self.test_client.get(
+            reverse(
+                POST_COMMENTS_URL, args=[CommentsPaginationTests.post.pk]
+            ),
+            {'cursor': response.context['next_cursor']}
+        )
+
+        self.assertTemplateUsed(fragment, 'includes/comments_list.html')
+        self.assertEqual(
+            list(fragment.context['comments']),
+            CommentsPaginationTests.comments_list[SORT_COMMENT:]
+        )
+        self.assertIsNone(fragment.context['next_cursor'])
@@ -0,0 +1,168 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from core.tagged_cache import invalidate_tags
+
+from ..models import Group, Post, User, Comment
+from .utils import execute_on_commit
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.author)
+        cls.INDEX = reverse('posts:index')
+        cls.PROFILE = reverse('posts:profile', args=[cls.author.username])
+        cls.POST_DETAIL = reverse('posts:post_detail', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(ConditionalGetTests.reader)
+
+    def revalidate(self, client, url, etag):
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified_without_queries(self):
+        """Неизменённая страница отдаётся 304 без запросов к базе."""
+
+        response = self.guest_client.get(self.INDEX)
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            response = self.revalidate(
+                self.guest_client, self.INDEX, response['ETag']
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_in_same_second_not_hidden(self):
+        """Правка в ту же секунду, что и прошлая, не даёт 304
+        по If-Modified-Since."""
+
+        last_modified = self.guest_client.get(self.INDEX)['Last-Modified']
+        with execute_on_commit():
+            self.post.save()
+
+        response = self.guest_client.get(
+            self.INDEX, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_group_edit_changes_post_etag(self):
+        """Правка группы поста меняет ETag страницы поста."""
+
+        group = Group.objects.create(title='Группа', slug='group')
+        with execute_on_commit():
+            Post.objects.filter(pk=self.post.pk).update(group=group)
+            invalidate_tags(f'post:{self.post.pk}')
+        self.guest_client.get(self.POST_DETAIL)
+        etag = self.guest_client.get(self.POST_DETAIL)['ETag']
+
+        with execute_on_commit():
+            group.title = 'Новое название'
+            group.save()
+
+        response = self.revalidate(self.guest_client, self.POST_DETAIL, etag)
+        self.assertContains(response, 'Новое название')
+
+    def test_writes_change_etag(self):
+        """Правка поста и комментарий меняют ETag."""
+
+        self.assertNotIn('ETag', self.guest_client.get(self.POST_DETAIL))
+        etags = {
+            url: self.guest_client.get(url)['ETag']
+            for url in (self.INDEX, self.POST_DETAIL)
+        }
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        self.assertEqual(self.revalidate(
+            self.guest_client, self.POST_DETAIL, etags[self.POST_DETAIL]
+        ).status_code, 200)
+
+        self.post.text = 'Исправленный пост'
+        with execute_on_commit():
+            self.post.save()
+        response = self.revalidate(
+            self.guest_client, self.INDEX, etags[self.INDEX]
+        )
+        self.assertContains(response, 'Исправленный пост')
+
+    def test_etag_depends_on_user(self):
+        """У каждого пользователя свой ETag и нет Last-Modified."""
+
+        guest_etag = self.guest_client.get(self.INDEX)['ETag']
+        response = self.reader_client.get(self.INDEX)
+
+        self.assertNotEqual(response['ETag'], guest_etag)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.revalidate(
+            self.reader_client, self.INDEX, guest_etag
+        ).status_code, 200)
+        self.assertEqual(self.revalidate(
+            self.reader_client, self.INDEX, response['ETag']
+        ).status_code, 304)
+
+    def test_profile_follow_changes_etag(self):
+        """Подписка на автора меняет ETag его профиля."""
+
+        self.reader_client.get(self.PROFILE)
+        etag = self.reader_client.get(self.PROFILE)['ETag']
+
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+
+        response = self.revalidate(self.reader_client, self.PROFILE, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Отписаться')
+
+    def test_move_to_other_group_changes_old_group_etag(self):
+        """Перенос поста в другую группу меняет ETag прежней группы."""
+
+        old = Group.objects.create(title='Старая', slug='old')
+        new = Group.objects.create(title='Новая', slug='new')
+        post = Post.objects.create(
+            text='Переносимый пост', author=self.author, group=old
+        )
+        url = reverse('posts:group_list', args=[old.slug])
+        self.guest_client.get(url)
+        etag = self.guest_client.get(url)['ETag']
+
+        post = Post.objects.get(pk=post.pk)
+        post.group = new
+        with execute_on_commit():
+            post.save()
+
+        response = self.revalidate(self.guest_client, url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Переносимый пост')
+
+    def test_author_rename_changes_list_etags(self):
+        """Смена имени автора меняет ETag index и его групп."""
+
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(text='Пост', author=self.author, group=group)
+        urls = (self.INDEX, reverse('posts:group_list', args=[group.slug]))
+        for url in urls:
+            self.guest_client.get(url)
+        etags = {url: self.guest_client.get(url)['ETag'] for url in urls}
+
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Новое имя'
+        with execute_on_commit():
+            author.save()
+
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.revalidate(
+                    self.guest_client, url, etags[url]
+                )
+                self.assertContains(response, 'Новое имя')
@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Post, User, Comment, Follow, UserStats
+
+
+class CountersTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.test_client = Client()
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_posts_count(self):
+        """Счётчик постов меняется при создании и удалении поста."""
+
+        post = Post.objects.create(text='Пост', author=CountersTests.author)
+        Post.objects.create(text='Пост 2', author=CountersTests.author)
+        self.assertEqual(self.stats(CountersTests.author).posts_count, 2)
+
+        post.delete()
+        self.assertEqual(self.stats(CountersTests.author).posts_count, 1)
+
+    def test_follow_counts(self):
+        """Счётчики подписчиков и подписок следуют за Follow."""
+
+        follow = Follow.objects.create(
+            user=CountersTests.reader, author=CountersTests.author
+        )
+        self.assertEqual(self.stats(CountersTests.author).followers_count, 1)
+        self.assertEqual(self.stats(CountersTests.reader).following_count, 1)
+
+        follow.delete()
+        self.assertEqual(self.stats(CountersTests.author).followers_count, 0)
+        self.assertEqual(self.stats(CountersTests.reader).following_count, 0)
+
+    def test_comments_count(self):
+        """Счётчик комментариев поста следует за Comment."""
+
+        post = Post.objects.create(text='Пост', author=CountersTests.author)
+        comment = Comment.objects.create(
+            post=post, author=CountersTests.reader, text='Комментарий'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_reconcile_counters_command(self):
+        """reconcile_counters исправляет рассинхронизированные счётчики."""
+
+        post = Post.objects.create(text='Пост', author=CountersTests.author)
+        Comment.objects.create(
+            post=post, author=CountersTests.reader, text='Комментарий'
+        )
+        UserStats.objects.filter(user=CountersTests.author).update(
+            posts_count=10
+        )
+        Post.objects.filter(pk=post.pk).update(comments_count=7)
+
+        call_command('reconcile_counters', chunk_size=1, stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertEqual(self.stats(CountersTests.author).posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+
+    def test_profile_reads_stats(self):
+        """Профиль показывает счётчики из UserStats."""
+
+        Post.objects.create(text='Пост', author=CountersTests.author)
+        UserStats.objects.filter(user=CountersTests.author).update(
+            posts_count=42
+        )
+
+        response = self.test_client.get(
+            reverse('posts:profile', args=[CountersTests.author.username])
+        )
+
+        self.assertEqual(response.context['posts_count'], 42)
@@ -0,0 +1,88 @@
+import os
+import tempfile
+from datetime import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.bulk import iter_json_array
+from ..models import Post, Group, User, Follow, Comment, FeedEntry
+
+
+class FastLoadTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def test_iter_json_array_reads_in_chunks(self):
+        """Объекты массива читаются по одному даже из маленьких кусков."""
+
+        stream = StringIO('[{"a": "[1, 2]"}, {"b": {"c": []}} ,\n{}]')
+        self.assertEqual(
+            list(iter_json_array(stream, read_size=3)),
+            [{'a': '[1, 2]'}, {'b': {'c': []}}, {}],
+        )
+
+    def test_iter_json_array_rejects_broken_json(self):
+        """Незакрытый массив и не-массив считаются ошибкой."""
+
+        for text in ('[{"a": 1}', '{"a": 1}'):
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    list(iter_json_array(StringIO(text), read_size=4))
+
+    def test_dump_and_load_round_trip(self):
+        """fastdump и fastload переносят данные вместе с датами,
+        а после загрузки пересобираются счётчики и ленты."""
+
+        pub_date = timezone.make_aware(datetime(2020, 1, 1))
+        post = Post.objects.create(
+            text='Старый пост',
+            author=FastLoadTests.author,
+            group=FastLoadTests.group,
+        )
+        Post.objects.filter(pk=post.pk).update(pub_date=pub_date)
+        Comment.objects.create(
+            post=post, author=FastLoadTests.reader, text='Комментарий'
+        )
+        Follow.objects.create(
+            user=FastLoadTests.reader, author=FastLoadTests.author
+        )
+
+        call_command(
+            'fastdump', 'posts.group', 'posts.post', 'posts.comment',
+            'posts.follow', output=self.path, chunk_size=1,
+        )
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        Follow.objects.all().delete()
+
+        call_command('fastload', self.path, batch_size=1, stdout=StringIO())
+
+        post = Post.objects.get(text='Старый пост')
+        self.assertEqual(post.pub_date, pub_date)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.group, FastLoadTests.group)
+        self.assertEqual(FastLoadTests.author.stats.posts_count, 1)
+        self.assertEqual(FastLoadTests.author.stats.followers_count, 1)
+        self.assertTrue(
+            FeedEntry.objects.filter(
+                user=FastLoadTests.reader, post=post
+            ).exists()
+        )
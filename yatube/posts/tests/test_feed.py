@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..models import Post, User, Follow, FeedEntry
+
+
+class FeedTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(FeedTests.reader)
+
+    def follow(self):
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[FeedTests.author.username])
+        )
+
+    def feed_posts(self):
+        return set(
+            FeedEntry.objects.filter(
+                user=FeedTests.reader
+            ).values_list('post_id', flat=True)
+        )
+
+    def test_new_post_added_to_feed(self):
+        """Новый пост попадает в ленту подписчика."""
+
+        self.follow()
+        post = Post.objects.create(text='Новый пост', author=FeedTests.author)
+
+        self.assertEqual(self.feed_posts(), {post.pk})
+
+    def test_follow_backfills_and_unfollow_prunes_feed(self):
+        """Подписка добавляет старые посты автора, отписка убирает их."""
+
+        post = Post.objects.create(text='Старый пост', author=FeedTests.author)
+
+        self.follow()
+        self.assertEqual(self.feed_posts(), {post.pk})
+
+        self.reader_client.get(
+            reverse(
+                'posts:profile_unfollow', args=[FeedTests.author.username]
+            )
+        )
+        self.assertEqual(self.feed_posts(), set())
+
+    @override_settings(FEED_MAX_LENGTH=3)
+    def test_feed_length_is_capped(self):
+        """Лента не длиннее FEED_MAX_LENGTH."""
+
+        self.follow()
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=FeedTests.author)
+            for i in range(5)
+        ]
+
+        self.assertEqual(
+            self.feed_posts(), {post.pk for post in posts[-3:]}
+        )
+
+    def test_rebuild_feeds_command(self):
+        """Команда rebuild_feeds восстанавливает ленты."""
+
+        post = Post.objects.create(text='Пост', author=FeedTests.author)
+        Follow.objects.create(user=FeedTests.reader, author=FeedTests.author)
+        FeedEntry.objects.all().delete()
+
+        call_command('rebuild_feeds', stdout=StringIO())
+
+        self.assertEqual(self.feed_posts(), {post.pk})
+
+    def test_rebuild_feeds_clears_feed_without_follows(self):
+        """rebuild_feeds очищает ленту того, кто ни на кого не подписан."""
+
+        post = Post.objects.create(text='Пост', author=FeedTests.author)
+        FeedEntry.objects.create(
+            user=FeedTests.reader,
+            post=post,
+            author=FeedTests.author,
+            pub_date=post.pub_date,
+        )
+
+        call_command('rebuild_feeds', stdout=StringIO())
+
+        self.assertEqual(self.feed_posts(), set())
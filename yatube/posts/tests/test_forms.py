@@ -4,6 +4,8 @@ import tempfile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from ..models import Post, User, Comment, Follow
@@ -82,7 +84,9 @@ class PostCreateFormTest(TestCase):
         self.assertTrue(
             Post.objects.filter(
                 text=form_data['text'],
-                image=f'posts/{IMAGE_NAME}',
+                image=default_storage.get_content_name(
+                    f'posts/{IMAGE_NAME}', ContentFile(IMAGE_VALUE)
+                ),
                 pub_date=latest_post.pub_date,
                 author=PostCreateFormTest.author,
                 group=None
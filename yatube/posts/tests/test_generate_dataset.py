@@ -0,0 +1,89 @@
+from collections import Counter
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Post, Group, User, Follow, Comment, FeedEntry
+
+
+class GenerateDatasetTests(TestCase):
+
+    def generate(self, seed=1):
+        call_command(
+            'generate_dataset', users=30, groups=3, posts=300, comments=100,
+            follows=60, seed=seed, batch_size=50, stdout=StringIO(),
+        )
+
+    def snapshot(self):
+        return list(
+            Post.objects.order_by('pk').values_list(
+                'author__username', 'group__slug', 'text', 'pub_date'
+            )
+        )
+
+    def test_volumes(self):
+        """Создаётся заданное число строк, счётчики и ленты пересчитаны."""
+
+        self.generate()
+
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(Follow.objects.count(), 60)
+        self.assertTrue(FeedEntry.objects.exists())
+
+        author = Post.objects.first().author
+        self.assertEqual(
+            author.stats.posts_count,
+            Post.objects.filter(author=author).count(),
+        )
+
+    def test_author_activity_is_skewed(self):
+        """Самый активный автор пишет намного больше медианного."""
+
+        self.generate()
+
+        counts = sorted(
+            Counter(Post.objects.values_list('author_id', flat=True))
+            .values(),
+            reverse=True,
+        )
+        self.assertGreater(counts[0], 5 * counts[len(counts) // 2])
+
+    def test_same_seed_same_data(self):
+        """Одинаковый seed даёт одинаковые данные."""
+
+        self.generate(seed=7)
+        first = self.snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+        self.generate(seed=7)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_all_possible_follows(self):
+        """Подписки на все возможные пары создаются без повторов."""
+
+        call_command(
+            'generate_dataset', users=6, groups=0, posts=0, comments=0,
+            follows=30, stdout=StringIO(),
+        )
+
+        pairs = set(Follow.objects.values_list('user_id', 'author_id'))
+        self.assertEqual(len(pairs), 30)
+        self.assertFalse(any(user == author for user, author in pairs))
+
+    def test_comments_not_after_end(self):
+        """Комментарии не датированы позже конца периода --end."""
+
+        end = timezone.now()
+        call_command(
+            'generate_dataset', users=10, groups=0, posts=50, comments=50,
+            follows=0, days=1, end=end, stdout=StringIO(),
+        )
+
+        self.assertFalse(Comment.objects.filter(created__gt=end).exists())
+        self.assertFalse(Post.objects.filter(pub_date__gt=end).exists())
@@ -0,0 +1,64 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..management.commands.index_advisor import find_problems
+from ..models import Post, Group, User, Follow, Comment
+
+
+class IndexAdvisorTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.author,
+            group=cls.group,
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.author, text='Комментарий'
+        )
+        Follow.objects.create(
+            user=User.objects.create_user(username='reader'),
+            author=cls.author,
+        )
+
+    def test_find_problems(self):
+        """Полные сканирования и временные B-деревья считаются проблемами."""
+
+        plan = [
+            'SCAN posts_post',
+            'SCAN posts_post USING INDEX post_pub_date_idx',
+            'SEARCH posts_comment USING INDEX comment_post_created_idx',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]
+        self.assertEqual(
+            find_problems(plan),
+            ['SCAN posts_post', 'USE TEMP B-TREE FOR ORDER BY'],
+        )
+
+    def test_hot_queries_use_indexes(self):
+        """Запросы страниц читают индексы без сортировки."""
+
+        stdout = StringIO()
+        call_command('index_advisor', strict=True, stdout=stdout)
+        self.assertNotIn('проблем', stdout.getvalue())
+
+    def test_plans_come_from_views(self):
+        """Планы строятся по SQL, который выполнили view: в них есть
+        поиск и запись в ленты."""
+
+        stdout = StringIO()
+        call_command('index_advisor', plans=True, stdout=stdout)
+        output = stdout.getvalue()
+        self.assertIn('posts_post_fts', output)
+        self.assertIn('DELETE FROM "posts_feedentry"', output)
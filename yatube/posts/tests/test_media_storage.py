@@ -0,0 +1,160 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from core.models import StoredFile
+from core.storage import TracedFileSystemStorage, is_content_name
+from ..models import Post, User
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+IMAGE_VALUE = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_IMAGE_VALUE = IMAGE_VALUE.replace(b'\xFF\xFF\xFF', b'\xFF\x00\x00')
+
+
+def upload(name='small.gif', content=IMAGE_VALUE):
+    return SimpleUploadedFile(name, content, content_type='image/gif')
+
+
+# Удаление файла откладывается до коммита, поэтому тесты идут
+# вне общей транзакции TestCase.
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ContentAddressedStorageTests(TransactionTestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+
+    def create_post(self, image):
+        return Post.objects.create(
+            text='Пост', author=self.author, image=image
+        )
+
+    def get_refs(self, name):
+        return StoredFile.objects.get(name=name).refs
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые загрузки хранятся одним файлом в подкаталогах."""
+
+        first = self.create_post(upload('first.GIF'))
+        second = self.create_post(upload('second.gif'))
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(is_content_name(first.image.name))
+        self.assertRegex(
+            first.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]+\.gif$'
+        )
+        self.assertEqual(self.get_refs(first.image.name), 2)
+
+        other = self.create_post(upload(content=OTHER_IMAGE_VALUE))
+        self.assertNotEqual(other.image.name, first.image.name)
+
+    def test_failed_delete_keeps_reference(self):
+        """Последняя ссылка отпускается в одной транзакции с удалением
+        файла: если файл не удалился, ссылка остаётся."""
+
+        name = default_storage.save(
+            'posts/small.gif', ContentFile(IMAGE_VALUE)
+        )
+
+        with mock.patch(
+            'django.core.files.storage.FileSystemStorage.delete',
+            side_effect=PermissionError,
+        ), self.assertRaises(PermissionError):
+            default_storage.delete(name)
+
+        self.assertEqual(self.get_refs(name), 1)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_file_deleted_with_last_reference(self):
+        """Файл удаляется вместе с последним постом, который на него
+        ссылается."""
+
+        first = self.create_post(upload())
+        second = self.create_post(upload())
+        name = first.image.name
+
+        first.delete()
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(self.get_refs(name), 1)
+
+        Post.objects.filter(pk=second.pk).delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_replaced_image_released(self):
+        """Заменённая при правке картинка отпускается."""
+
+        post = self.create_post(upload())
+        old_name = post.image.name
+
+        post = Post.objects.get(pk=post.pk)
+        post.image = upload(content=OTHER_IMAGE_VALUE)
+        post.save()
+
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertTrue(default_storage.exists(post.image.name))
+
+    def test_same_image_reuploaded(self):
+        """Повторная загрузка той же картинки при правке не оставляет
+        лишней ссылки."""
+
+        post = self.create_post(upload())
+        name = post.image.name
+
+        post = Post.objects.get(pk=post.pk)
+        post.image = upload(name='again.gif')
+        post.save()
+
+        self.assertEqual(post.image.name, name)
+        self.assertEqual(self.get_refs(name), 1)
+        post.delete()
+        self.assertFalse(default_storage.exists(name))
+
+    def test_migrate_media(self):
+        """Старые картинки переносятся, посты переключаются, а старые
+        файлы удаляются только по --delete-old."""
+
+        legacy = TracedFileSystemStorage().save(
+            'posts/legacy.gif', ContentFile(IMAGE_VALUE)
+        )
+        posts = [self.create_post(legacy) for _ in range(2)]
+
+        call_command('migrate_media', stdout=StringIO())
+
+        names = {
+            post.image.name for post in Post.objects.filter(
+                pk__in=[post.pk for post in posts]
+            )
+        }
+        self.assertEqual(len(names), 1)
+        new_name = names.pop()
+        self.assertTrue(is_content_name(new_name))
+        self.assertEqual(self.get_refs(new_name), 2)
+        self.assertTrue(default_storage.exists(legacy))
+
+        out = StringIO()
+        call_command('migrate_media', delete_old=True, stdout=out)
+        self.assertIn('Перенесено картинок: 0', out.getvalue())
+        self.assertFalse(default_storage.exists(legacy))
+        self.assertTrue(default_storage.exists(new_name))
@@ -0,0 +1,130 @@
+import shutil
+import tempfile
+import threading
+
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core.metrics import Registry
+from ..models import Post, User
+
+
+class RegistryTests(TestCase):
+
+    def setUp(self):
+        self.registry = Registry()
+        self.requests = self.registry.counter(
+            'requests_total', 'Запросы.', ('view',)
+        )
+        self.latency = self.registry.histogram(
+            'latency_seconds', 'Время.', buckets=(0.1, 1)
+        )
+
+    def test_threads_are_summed(self):
+        """Значения из разных потоков складываются."""
+
+        def work():
+            for _ in range(100):
+                self.requests.inc(view='posts:index')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(
+            self.registry.snapshot()[('requests_total', ('posts:index',))],
+            400,
+        )
+
+    def test_prometheus_format(self):
+        """Гистограмма выводится накопительными корзинами."""
+
+        for value in (0.05, 0.1, 0.5, 3):
+            self.latency.observe(value)
+        self.requests.inc(view='say "hi"')
+
+        text = self.registry.render()
+
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 2', text)
+        self.assertIn('latency_seconds_bucket{le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_sum 3.65', text)
+        self.assertIn('latency_seconds_count 4', text)
+        self.assertIn('requests_total{view="say \\"hi\\""} 1', text)
+
+    def test_workers_are_summed_through_files(self):
+        """Процессы складываются через файлы в METRICS_DIR."""
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        other = Registry()
+        other_requests = other.counter(
+            'requests_total', 'Запросы.', ('view',)
+        )
+        self.registry.worker_id, other.worker_id = 'first', 'second'
+
+        self.requests.inc(2, view='posts:index')
+        other_requests.inc(3, view='posts:index')
+        with override_settings(METRICS_DIR=directory):
+            other.flush()
+            samples = self.registry.collect()
+
+        self.assertEqual(samples[('requests_total', ('posts:index',))], 5)
+
+
+class MetricsViewTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.admin_client = Client()
+        self.admin_client.force_login(MetricsViewTests.admin)
+
+    def test_only_staff(self):
+        """/metrics доступен только администраторам и по токену."""
+
+        author_client = Client()
+        author_client.force_login(MetricsViewTests.author)
+
+        self.assertEqual(self.guest_client.get('/metrics').status_code, 403)
+        self.assertEqual(author_client.get('/metrics').status_code, 403)
+        self.assertEqual(self.admin_client.get('/metrics').status_code, 200)
+
+        with override_settings(METRICS_TOKEN='secret'):
+            response = self.guest_client.get(
+                '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_views_and_page_cache_are_counted(self):
+        """Запросы считаются по имени view, а кэш страниц — по hit/miss."""
+
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(reverse('posts:index'))
+
+        text = self.admin_client.get('/metrics').content.decode()
+
+        self.assertIn(
+            'yatube_requests_total{view="posts:index",status="200"}', text
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"}', text
+        )
+        self.assertIn(
+            'yatube_page_cache_total{page="index_page",result="hit"}', text
+        )
+        self.assertIn(
+            'yatube_page_cache_total{page="index_page",result="miss"}', text
+        )
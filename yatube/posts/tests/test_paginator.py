@@ -0,0 +1,79 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Post, User
+from ..utils import OFFSET_PAGES_LIMIT, SORT_POST
+
+
+KEY_PAGE_OBJ = 'page_obj'
+INDEX_URL = 'posts:index'
+
+
+class CursorPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+
+        for i in range(SORT_POST * 3 + 5):
+            Post.objects.create(text=f'Пост {i}', author=cls.author)
+
+        cls.posts_list = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        cache.clear()
+
+        self.test_client = Client()
+
+    def get_page(self, **params):
+        response = self.test_client.get(reverse(INDEX_URL), params)
+        return response.context[KEY_PAGE_OBJ]
+
+    def test_cursor_walks_all_posts(self):
+        """Переход по next_cursor выдаёт все посты без повторов."""
+
+        page = self.get_page()
+        posts = list(page)
+
+        while page.has_next():
+            page = self.get_page(cursor=page.next_cursor)
+            posts.extend(page)
+
+        self.assertEqual(posts, CursorPaginatorTests.posts_list)
+        self.assertEqual(page.number, 4)
+
+    def test_previous_cursor(self):
+        """previous_cursor возвращает на предыдущую страницу."""
+
+        second = self.get_page(page=2)
+        third = self.get_page(cursor=second.next_cursor)
+        back = self.get_page(cursor=third.previous_cursor)
+
+        self.assertEqual(list(back), list(second))
+        self.assertEqual(back.number, 2)
+
+    def test_offset_page_matches_cursor_page(self):
+        """Старые ссылки ?page=N работают для первых страниц."""
+
+        first = self.get_page()
+        second = self.get_page(page=2)
+
+        self.assertEqual(
+            list(second), list(self.get_page(cursor=first.next_cursor))
+        )
+
+    def test_deep_and_broken_links_show_first_page(self):
+        """Глубокие ?page=N и испорченный курсор ведут на первую страницу."""
+
+        first_page = CursorPaginatorTests.posts_list[:SORT_POST]
+
+        for params in (
+            {'page': OFFSET_PAGES_LIMIT + 1},
+            {'cursor': 'broken'},
+        ):
+            with self.subTest(params=params):
+                page = self.get_page(**params)
+                self.assertEqual(list(page), first_page)
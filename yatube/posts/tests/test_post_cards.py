@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Follow, Post, User
+
+
+INDEX_URL = 'posts:index'
+
+
+class PostCardsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+
+        self.test_client = Client()
+        self.test_client.force_login(PostCardsTests.author)
+
+        self.post = Post.objects.create(
+            text='Исходный текст', author=PostCardsTests.author
+        )
+
+    def test_card_is_cached(self):
+        """Карточка поста берётся из кэша, пока пост не изменён."""
+
+        self.test_client.get(reverse(INDEX_URL))
+
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+
+        response = self.test_client.get(reverse(INDEX_URL))
+        self.assertContains(response, 'Исходный текст')
+
+    def test_edited_post_card_refreshed(self):
+        """После редактирования поста карточка рендерится заново."""
+
+        self.test_client.get(reverse(INDEX_URL))
+
+        self.post.text = 'Новый текст'
+        self.post.save()
+
+        response = self.test_client.get(reverse(INDEX_URL))
+        self.assertContains(response, 'Новый текст')
+        self.assertNotContains(response, 'Исходный текст')
+
+    def test_author_rename_refreshes_card(self):
+        """После смены имени автора карточка рендерится заново."""
+
+        self.test_client.get(reverse(INDEX_URL))
+
+        PostCardsTests.author.first_name = 'Новое'
+        PostCardsTests.author.last_name = 'Имя'
+        PostCardsTests.author.save()
+
+        response = self.test_client.get(reverse(INDEX_URL))
+        self.assertContains(response, 'Новое Имя')
+
+    def test_card_survives_unrelated_writes(self):
+        """Подписка на автора и новый пост не сбрасывают карточку."""
+
+        self.test_client.get(reverse(INDEX_URL))
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=PostCardsTests.author)
+        Post.objects.create(text='Другой пост', author=reader)
+
+        response = self.test_client.get(reverse(INDEX_URL))
+        self.assertContains(response, 'Исходный текст')
@@ -0,0 +1,103 @@
+import os
+import sys
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core.profiling import Sampler, make_signature
+from ..models import Post, User
+
+
+def work():
+    time.sleep(0.05)
+
+
+class SamplerTests(TestCase):
+
+    def test_stacks_are_collapsed(self):
+        """Стек снимается от корневого кадра до текущего."""
+
+        with Sampler(sys._getframe(), 0.001) as sampler:
+            work()
+
+        stacks = [stack for stack in sampler.stacks if 'work' in stack]
+        self.assertTrue(stacks)
+        self.assertTrue(stacks[0].startswith(
+            'posts.tests.test_profiling:test_stacks_are_collapsed;'
+        ))
+        self.assertTrue(stacks[0].endswith('posts.tests.test_profiling:work'))
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.url = reverse('posts:profile', kwargs={'username': 'author'})
+        self.view_dir = os.path.join(self.directory, 'posts.profile')
+
+    def get(self, client, url, **extra):
+        with override_settings(
+            PROFILER_DIR=self.directory, PROFILER_INTERVAL=0.0001
+        ):
+            return client.get(url, **extra)
+
+    def test_staff_flag(self):
+        """?profile профилирует запрос только администратора."""
+
+        author_client = Client()
+        author_client.force_login(ProfilingMiddlewareTests.author)
+        self.get(author_client, self.url + '?profile')
+        self.assertFalse(os.path.exists(self.view_dir))
+
+        admin_client = Client()
+        admin_client.force_login(ProfilingMiddlewareTests.admin)
+        self.get(admin_client, self.url + '?profile')
+        self.assertTrue(os.listdir(self.view_dir))
+
+    def test_signed_header(self):
+        """Заголовок X-Profile работает только с верной подписью."""
+
+        self.get(Client(), self.url, HTTP_X_PROFILE='profile:bad:sign')
+        self.assertFalse(os.path.exists(self.view_dir))
+
+        self.get(Client(), self.url, HTTP_X_PROFILE=make_signature())
+        self.assertTrue(os.listdir(self.view_dir))
+
+    def test_sample_rate_and_merge(self):
+        """Выборка 1 из N и сборка стеков в один файл."""
+
+        with override_settings(PROFILER_SAMPLE_RATE=1):
+            self.get(Client(), self.url)
+            self.get(Client(), self.url)
+
+        output = os.path.join(self.directory, 'profile.folded')
+        with override_settings(PROFILER_DIR=self.directory):
+            call_command(
+                'flamegraph', 'posts:profile', output=output,
+                stderr=StringIO(),
+            )
+        with open(output, encoding='utf-8') as file:
+            lines = file.read().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertTrue(stack.startswith(
+                'posts.profile;core.profiling:__call__'
+            ))
+            self.assertGreater(int(count), 0)
@@ -0,0 +1,130 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Post, Group, User, Comment, Follow
+from ..urls import urlpatterns
+from .utils import QueryBudgetMixin
+
+
+# Бюджеты для холодного кэша; у авторизованного пользователя
+# два запроса уходят на сессию и пользователя.
+QUERY_BUDGETS = {
+    'index': 1,
+    'group_list': 2,
+    'profile': 5,
+    'post_detail': 4,
+    'post_create': 3,
+    'post_edit': 4,
+    'add_comment': 5,
+    'post_comments': 1,
+    'follow_index': 3,
+    'profile_follow': 4,
+    'profile_unfollow': 8,
+    'search': 3,
+}
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+        for i in range(15):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+        cls.post = Post.objects.latest('pub_date')
+
+        for i in range(5):
+            commenter = User.objects.create_user(username=f'commenter{i}')
+            Comment.objects.create(
+                post=cls.post, author=commenter, text=f'Комментарий {i}'
+            )
+
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.reader_client = Client()
+
+        self.author_client.force_login(QueryBudgetTests.author)
+        self.reader_client.force_login(QueryBudgetTests.reader)
+
+    def get_requests(self):
+        author = QueryBudgetTests.author.username
+        post_id = QueryBudgetTests.post.pk
+        group = QueryBudgetTests.group.slug
+
+        return {
+            'index': (self.guest_client.get, reverse('posts:index')),
+            'group_list': (
+                self.guest_client.get,
+                reverse('posts:group_list', args=[group])
+            ),
+            'profile': (
+                self.reader_client.get, reverse('posts:profile', args=[author])
+            ),
+            'post_detail': (
+                self.reader_client.get,
+                reverse('posts:post_detail', args=[post_id])
+            ),
+            'post_create': (
+                self.author_client.get, reverse('posts:post_create')
+            ),
+            'post_edit': (
+                self.author_client.get,
+                reverse('posts:post_edit', args=[post_id])
+            ),
+            'add_comment': (
+                lambda url: self.reader_client.post(url, {'text': 'Ещё'}),
+                reverse('posts:add_comment', args=[post_id])
+            ),
+            'post_comments': (
+                self.guest_client.get,
+                reverse('posts:post_comments', args=[post_id])
+            ),
+            'follow_index': (
+                self.reader_client.get, reverse('posts:follow_index')
+            ),
+            'profile_follow': (
+                self.reader_client.get,
+                reverse('posts:profile_follow', args=[author])
+            ),
+            'profile_unfollow': (
+                self.reader_client.get,
+                reverse('posts:profile_unfollow', args=[author])
+            ),
+            'search': (
+                lambda url: self.guest_client.get(
+                    url, {'q': 'пост', 'group': group}
+                ),
+                reverse('posts:search')
+            ),
+        }
+
+    def test_every_view_has_budget(self):
+        """Для каждого view из posts.urls задан бюджет запросов."""
+
+        for pattern in urlpatterns:
+            with self.subTest(view=pattern.name):
+                self.assertIn(pattern.name, QUERY_BUDGETS)
+
+    def test_views_fit_query_budget(self):
+        """Каждый view укладывается в свой бюджет запросов."""
+
+        for name, (send, url) in self.get_requests().items():
+            with self.subTest(view=name):
+                cache.clear()
+                with self.assertQueryBudget(QUERY_BUDGETS[name]):
+                    send(url)
@@ -0,0 +1,185 @@
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import User as AdminUser
+from django.db import connection
+from django.db.models.signals import post_migrate
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from ..search import get_missing_triggers, search_posts
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.best = Post.objects.create(
+            text='Кот кот кот', author=cls.author, group=cls.group
+        )
+        cls.weak = Post.objects.create(
+            text='Кот и собака долго гуляли по парку вечером',
+            author=cls.other,
+        )
+        cls.unrelated = Post.objects.create(
+            text='Собака', author=cls.author
+        )
+        cls.SEARCH = reverse('posts:search')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_ranked_by_relevance(self):
+        """Пост с частым словом выше, посторонние не попадают."""
+
+        page = search_posts('кот', 10)
+        self.assertEqual(page.posts, [self.best, self.weak])
+        self.assertIsNone(page.next_cursor)
+
+    def test_case_and_diacritics(self):
+        """Регистр и диакритика не влияют на поиск."""
+
+        post = Post.objects.create(text='Café Ёлка', author=self.author)
+        self.assertEqual(search_posts('CAFE', 10).posts, [post])
+
+    def test_filters(self):
+        """Фильтры по группе и автору."""
+
+        self.assertEqual(
+            search_posts('кот', 10, group_id=self.group.pk).posts,
+            [self.best],
+        )
+        self.assertEqual(
+            search_posts('кот', 10, author_id=self.other.pk).posts,
+            [self.weak],
+        )
+        response = self.guest_client.get(
+            self.SEARCH, {'q': 'кот', 'author': 'other'}
+        )
+        self.assertEqual(list(response.context['page'].posts), [self.weak])
+
+    def test_unknown_filter(self):
+        """Несуществующая группа -- ошибка формы, а не пустой поиск."""
+
+        response = self.guest_client.get(
+            self.SEARCH, {'q': 'кот', 'group': 'missing'}
+        )
+        self.assertIsNone(response.context['page'])
+        self.assertTrue(response.context['form'].errors['group'])
+
+    def test_cursor_pages(self):
+        """Страницы по курсору идут без повторов и пропусков."""
+
+        for index in range(5):
+            Post.objects.create(
+                text='кот ' + 'слово ' * index, author=self.author
+            )
+        expected = search_posts('кот', 100).posts
+
+        seen = []
+        cursor = None
+        while True:
+            page = search_posts('кот', 2, cursor=cursor)
+            seen += page.posts
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+        response = self.guest_client.get(
+            self.SEARCH, {'q': 'кот', 'cursor': 'forged'}
+        )
+        self.assertEqual(
+            list(response.context['page'].posts), expected
+        )
+
+    def test_index_follows_edits(self):
+        """Индекс обновляется при правке и удалении поста."""
+
+        post = Post.objects.create(text='Черепаха', author=self.author)
+        self.assertEqual(search_posts('черепаха', 10).posts, [post])
+
+        post.text = 'Ёж'
+        post.save()
+        self.assertEqual(search_posts('черепаха', 10).posts, [])
+        self.assertEqual(search_posts('ёж', 10).posts, [post])
+
+        post.delete()
+        self.assertEqual(search_posts('ёж', 10).posts, [])
+
+    def test_lost_triggers_restored_after_migrate(self):
+        """После миграций недостающие триггеры индекса создаются
+        заново."""
+
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER posts_post_fts_insert')
+        self.assertEqual(
+            get_missing_triggers(connection), ['posts_post_fts_insert']
+        )
+
+        app_config = apps.get_app_config('posts')
+        post_migrate.send(
+            sender=app_config, app_config=app_config, verbosity=0,
+            interactive=False, using=connection.alias, apps=apps, plan=[],
+        )
+
+        self.assertEqual(get_missing_triggers(connection), [])
+        post = Post.objects.create(text='Черепаха', author=self.author)
+        self.assertEqual(search_posts('черепаха', 10).posts, [post])
+
+    def test_query_syntax_is_ignored(self):
+        """Операторы FTS5 во вводе считаются словами или отбрасываются."""
+
+        for query in ('кот OR', '"кот', 'author_id:1 кот', 'NEAR(кот', '*'):
+            with self.subTest(query=query):
+                response = self.guest_client.get(self.SEARCH, {'q': query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_admin_search(self):
+        """Поиск в админке идёт по индексу."""
+
+        admin = AdminUser.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'КОТ'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.best, self.weak},
+        )
+
+    def test_cursor_continues_into_older_windows(self):
+        """Курсор переходит в окна более старых постов, а внутри окна
+        посты упорядочены по релевантности."""
+
+        older = Post.objects.create(text='кот кот кот кот', author=self.author)
+        newer = [
+            Post.objects.create(text=f'кот {index}', author=self.author)
+            for index in range(3)
+        ]
+
+        seen = []
+        cursor = None
+        with mock.patch('posts.search.SEARCH_CANDIDATES', 2):
+            while True:
+                page = search_posts('кот', 2, cursor=cursor)
+                seen += page.posts
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+
+        expected = {self.best, self.weak, older, *newer}
+        self.assertEqual(len(seen), len(expected))
+        self.assertEqual(set(seen), expected)
+        self.assertEqual(seen[2:4], [older, newer[0]])
@@ -0,0 +1,86 @@
+import json
+import re
+
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core.server_timing import Timings, _local
+from ..models import Post, User
+
+
+@override_settings(SERVER_TIMING=True)
+class ServerTimingTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def get_metrics(self, response):
+        return {
+            name: params
+            for name, params in re.findall(
+                r'(\w+);(dur=[\d.]+(?:;desc="[^"]*")?)',
+                response['Server-Timing'],
+            )
+        }
+
+    def test_header_on_cold_and_cached_page(self):
+        """Заголовок показывает запросы и шаблоны, а на кэшированной
+        странице — только попадания в кэш."""
+
+        metrics = self.get_metrics(
+            self.guest_client.get(reverse('posts:index'))
+        )
+        self.assertEqual(
+            set(metrics), {'db', 'cache', 'tpl', 'thumb', 'total'}
+        )
+        self.assertIn('desc="1 queries"', metrics['db'])
+        self.assertNotEqual(metrics['tpl'], 'dur=0.00')
+
+        metrics = self.get_metrics(
+            self.guest_client.get(reverse('posts:index'))
+        )
+        self.assertIn('desc="0 queries"', metrics['db'])
+        self.assertIn(' 0 misses', metrics['cache'])
+        self.assertEqual(metrics['tpl'], 'dur=0.00')
+
+    def test_cache_hits_and_misses(self):
+        """Попадания и промахи считаются по ключам, включая get_many."""
+
+        _local.timings = timings = Timings()
+        try:
+            cache.set('a', 1)
+            cache.get('a')
+            cache.get('b')
+            cache.get_many(['a', 'b', 'c'])
+        finally:
+            _local.timings = None
+
+        self.assertEqual(timings.counts['cache_hits'], 2)
+        self.assertEqual(timings.counts['cache_misses'], 3)
+
+    @override_settings(SERVER_TIMING_LOG=True)
+    def test_log_line(self):
+        """Со SERVER_TIMING_LOG каждый запрос пишется строкой JSON."""
+
+        with self.assertLogs('yatube.server_timing', 'INFO') as logs:
+            self.guest_client.get(reverse('posts:index'))
+
+        fields = json.loads(logs.records[0].getMessage())
+        self.assertEqual(fields['path'], reverse('posts:index'))
+        self.assertEqual(fields['db_queries'], 1)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_disabled(self):
+        """Без SERVER_TIMING заголовка нет."""
+
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
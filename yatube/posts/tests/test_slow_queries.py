@@ -0,0 +1,82 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..management.commands.slowqueries import normalize
+from ..models import Post, User
+
+
+class SlowQueryLogTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'slow.jsonl')
+        settings = override_settings(
+            SLOW_QUERY_LOG=self.path, SLOW_QUERY_THRESHOLD_MS=0
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def read_log(self):
+        with open(self.path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_view_is_attributed(self):
+        """Запрос связывается с view, а SELECT получает план."""
+
+        Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+
+        entries = [
+            entry for entry in self.read_log()
+            if entry['view'] == 'posts.views.post_detail'
+        ]
+        self.assertTrue(entries)
+        self.assertTrue(any(entry['plan'] for entry in entries))
+        self.assertIn(str(self.post.pk), entries[0]['params'])
+
+    def test_template_line_is_attributed(self):
+        """Ленивое обращение к атрибуту в шаблоне видно как источник."""
+
+        post = Post.objects.get(pk=self.post.pk)
+        Template('<p>\n{{ post.author.username }}\n</p>').render(
+            Context({'post': post})
+        )
+
+        entry = self.read_log()[-1]
+        self.assertIn('auth_user', entry['sql'])
+        self.assertEqual(entry['template']['line'], 2)
+
+    def test_command_aggregates_by_shape(self):
+        """Запросы одной формы с разными параметрами складываются."""
+
+        for pk in (self.post.pk, self.post.pk + 1, self.post.pk + 2):
+            Post.objects.filter(pk=pk).first()
+        Post.objects.filter(pk__in=[1, 2, 3]).count()
+
+        out = StringIO()
+        call_command('slowqueries', stdout=out)
+
+        self.assertIn('3 раз', out.getvalue())
+        self.assertEqual(
+            normalize('SELECT * FROM "t" WHERE "id" IN (%s, %s) LIMIT 21'),
+            'SELECT * FROM "t" WHERE "id" IN (...) LIMIT ?',
+        )
@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from core.cache_backends import SQLiteCache
+
+
+def increment(location):
+    cache = SQLiteCache(location, {})
+    for _ in range(50):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.location = os.path.join(directory, 'cache.sqlite3')
+        self.cache = self.get_cache()
+
+    def get_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_shared_between_instances(self):
+        """Записи видны другому соединению с тем же файлом."""
+
+        self.cache.set_many({'a': 1, 'b': {'posts': [1, 2]}})
+
+        other = self.get_cache()
+        self.assertEqual(
+            other.get_many(['a', 'b', 'c']), {'a': 1, 'b': {'posts': [1, 2]}}
+        )
+        other.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_ttl_and_add(self):
+        """Истёкшая запись не читается, и add может её заменить."""
+
+        self.cache.set('key', 'old', 0.01)
+        self.assertTrue(self.cache.add('other', 'value'))
+        self.assertFalse(self.cache.add('other', 'new'))
+        time.sleep(0.02)
+
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertEqual(self.cache.get('key'), 'new')
+        self.assertEqual(self.cache.get('other'), 'value')
+
+    def test_incr_is_atomic_across_processes(self):
+        """incr из нескольких процессов не теряет приращений."""
+
+        self.cache.set('counter', 0)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=increment, args=(self.location,))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_lru_eviction(self):
+        """При превышении бюджета удаляются давно не читанные записи."""
+
+        cache = self.get_cache(MAX_SIZE=20000, ACCESS_RESOLUTION=0)
+        cache.set('hot', 'x' * 100)
+        for number in range(300):
+            cache.get('hot')
+            cache.set(f'cold-{number}', 'x' * 100)
+
+        total, = cache.db.execute('SELECT total FROM cache_size').fetchone()
+        self.assertLessEqual(total, 20000)
+        self.assertIsNotNone(cache.get('hot'))
+        self.assertIsNone(cache.get('cold-0'))
+        self.assertIsNotNone(cache.get('cold-299'))
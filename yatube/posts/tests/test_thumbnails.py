@@ -0,0 +1,214 @@
+import shutil
+import tempfile
+import time
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from core.thumbnail_backends import MISS_CACHE_TIMEOUT
+
+from ..models import Post, User
+from ..forms import PostForm
+from ..thumbnails import (
+    FORMATS, GEOMETRIES, WIDTHS, generate_thumbnails, get_ready_thumbnail,
+    submit,
+)
+from ..utils import post_tags
+from .utils import execute_on_commit
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+IMAGE_VALUE = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+VARIANTS_COUNT = len(GEOMETRIES) * len(WIDTHS) * len(FORMATS)
+
+
+def original(post):
+    """Исходный файл в разметке: так картинка показывается,
+    пока миниатюры не готовы."""
+    return f'src="{post.image.url}"'
+
+
+def make_jpeg(size, orientation=1):
+    image = Image.new('RGB', size, (200, 0, 0))
+    exif = image.getexif()
+    exif[0x0112] = orientation
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=ThumbnailTests.author,
+            image=SimpleUploadedFile(
+                'small.gif', IMAGE_VALUE, content_type='image/gif'
+            ),
+        )
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+
+    def test_original_until_ready(self):
+        """Пока миниатюр нет, показывается исходный файл на фоне
+        среднего цвета, и он не остаётся в кэше после их создания."""
+
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, original(self.post))
+                self.assertContains(
+                    response,
+                    f'background-color: {self.post.placeholder_color}',
+                )
+
+        submit(self.post.image.name, post_tags(self.post))
+
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertNotContains(response, original(self.post))
+                self.assertContains(response, '<img class="card-img')
+                self.assertContains(response, ' 480w, ')
+        self.assertContains(
+            self.guest_client.get(self.urls[0]), 'loading="lazy"'
+        )
+
+    def test_reads_do_not_generate(self):
+        """Страницы с заглушкой не создают миниатюры и не ставят их
+        в очередь."""
+
+        with execute_on_commit():
+            for url in self.urls:
+                self.guest_client.get(url)
+
+        self.assertIsNone(get_ready_thumbnail(self.post.image, 'card'))
+        self.assertEqual(
+            generate_thumbnails(self.post.image.name), VARIANTS_COUNT
+        )
+
+    def test_generated_once(self):
+        """Готовые миниатюры не создаются повторно."""
+
+        self.assertEqual(
+            generate_thumbnails(self.post.image.name), VARIANTS_COUNT
+        )
+        self.assertEqual(generate_thumbnails(self.post.image.name), 0)
+        for size in ('card', 'detail'):
+            self.assertIsNotNone(get_ready_thumbnail(self.post.image, size))
+
+    def test_miss_cached_briefly(self):
+        """Отсутствие миниатюры кэшируется ненадолго, и созданную
+        другим процессом миниатюру видно без перезапуска."""
+
+        self.assertIsNone(get_ready_thumbnail(self.post.image, 'card'))
+        # Другой процесс пишет в базу, но не в кэш этого процесса.
+        with mock.patch.object(default.kvstore.cache, 'set'):
+            generate_thumbnails(self.post.image.name)
+        self.assertIsNone(get_ready_thumbnail(self.post.image, 'card'))
+
+        later = time.time() + MISS_CACHE_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertIsNotNone(
+                get_ready_thumbnail(self.post.image, 'card')
+            )
+
+    def test_warm_thumbnails(self):
+        """Команда создаёт миниатюры всех картинок."""
+
+        out = StringIO()
+        call_command('warm_thumbnails', processes=0, stdout=out)
+        self.assertIn(f'создано миниатюр: {VARIANTS_COUNT}', out.getvalue())
+        self.assertIsNotNone(get_ready_thumbnail(self.post.image, 'card'))
+        self.post.refresh_from_db()
+        self.assertRegex(self.post.placeholder_color, r'^#[0-9a-f]{6}$')
+
+        out = StringIO()
+        call_command('warm_thumbnails', processes=0, stdout=out)
+        self.assertIn('создано миниатюр: 0', out.getvalue())
+
+    def test_page_lookup_is_batched(self):
+        """Миниатюры страницы ищутся одним запросом к хранилищу ключей."""
+
+        posts = [self.post] + [
+            Post.objects.create(
+                text=f'Ещё пост {i}', author=ThumbnailTests.author,
+                image=SimpleUploadedFile(
+                    f'small{i}.gif', IMAGE_VALUE, content_type='image/gif'
+                ),
+            )
+            for i in range(5)
+        ]
+        for post in posts:
+            generate_thumbnails(post.image.name)
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(reverse('posts:index'))
+        for post in posts:
+            self.assertNotContains(response, original(post))
+        kvstore_queries = [
+            query for query in queries.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+
+    def test_upload_is_normalized(self):
+        """Повёрнутая по EXIF картинка при загрузке поворачивается,
+        а у поста появляется цвет заглушки."""
+
+        form = PostForm(
+            data={'text': 'Снимок с телефона'},
+            files={'image': SimpleUploadedFile(
+                'photo.jpg', make_jpeg((40, 20), orientation=6),
+                content_type='image/jpeg',
+            )},
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        form.instance.author = ThumbnailTests.author
+        post = form.save()
+
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (20, 40))
+            self.assertEqual(image.getexif().get(0x0112, 1), 1)
+        red, green, blue = (
+            int(post.placeholder_color[i:i + 2], 16) for i in (1, 3, 5)
+        )
+        self.assertGreater(red, 150)
+        self.assertLess(green, 50)
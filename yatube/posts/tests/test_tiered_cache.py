@@ -0,0 +1,144 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core.tagged_cache import invalidate_tags
+from core.tiered_cache import LOCK_KEY, TieredCache, cached
+from ..models import Post, User
+
+
+class TieredCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.tiered = TieredCache()
+        self.calls = 0
+
+    def build(self, value='value', delay=0):
+        def build():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+        return build
+
+    def expire(self, key):
+        entry = cache.get(key)
+        entry['expires'] = time.time() - 1
+        cache.set(key, entry)
+        self.tiered.clear_l1()
+
+    def test_single_flight(self):
+        """Пока одно значение считается, остальные ждут его."""
+
+        results = []
+
+        def worker():
+            results.append(self.tiered.get_or_set(
+                'key', self.build(delay=0.2), 60
+            ))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['value'] * 4)
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_while_revalidate(self):
+        """Пока другой запрос пересчитывает, отдаётся старое значение."""
+
+        self.tiered.get_or_set('key', self.build('old'), 60)
+        self.expire('key')
+        cache.add(LOCK_KEY.format('key'), 1)
+
+        self.assertEqual(
+            self.tiered.get_or_set('key', self.build('new'), 60), 'old'
+        )
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_if_error(self):
+        """Если база недоступна, отдаётся устаревшее значение."""
+
+        def broken():
+            raise OperationalError('database is locked')
+
+        self.tiered.get_or_set('key', self.build('old'), 60)
+        self.expire('key')
+
+        with self.assertLogs('yatube.cache', 'WARNING'):
+            self.assertEqual(
+                self.tiered.get_or_set('key', broken, 60), 'old'
+            )
+        with self.assertRaises(OperationalError):
+            self.tiered.get_or_set('other', broken, 60)
+
+    def test_early_refresh(self):
+        """Долгие значения пересчитываются до конца срока."""
+
+        entry = {'value': 1, 'expires': time.time() + 10, 'delta': 0}
+        self.assertFalse(self.tiered.should_refresh(entry))
+
+        entry['delta'] = 1000
+        with override_settings(CACHE_EARLY_REFRESH_BETA=1000):
+            self.assertTrue(self.tiered.should_refresh(entry))
+
+    def test_l1(self):
+        """L1 отвечает без общего кэша и очищается вместе с ним."""
+
+        self.tiered.get_or_set('key', self.build('value'), 60)
+        cache.delete('key')
+
+        self.assertEqual(
+            self.tiered.get_or_set('key', self.build('new'), 60), 'value'
+        )
+        cache.clear()
+        self.assertEqual(
+            self.tiered.get_or_set('key', self.build('new'), 60), 'new'
+        )
+
+    def test_decorator(self):
+        """Функция считается один раз на набор аргументов."""
+
+        @cached(60, key='square:{0}')
+        def square(number):
+            self.calls += 1
+            return number * number
+
+        self.assertEqual([square(3), square(3), square(4)], [9, 9, 16])
+        self.assertEqual(self.calls, 2)
+
+
+class StalePageTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_page_served_stale_on_database_error(self):
+        """Страница отдаётся из кэша, если база упала при пересчёте."""
+
+        client = Client()
+        first = client.get(reverse('posts:index'))
+        invalidate_tags('feed:index')
+
+        with mock.patch(
+            'posts.views.get_page',
+            side_effect=OperationalError('database is locked'),
+        ), self.assertLogs('yatube.cache', 'WARNING'):
+            response = client.get(reverse('posts:index'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, first.content)
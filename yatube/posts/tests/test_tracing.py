@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core.storage import TracedFileSystemStorage
+from core.tracing import Trace, _local, span, writer
+from ..models import Post, User
+
+
+class SpanTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_nested_spans(self):
+        """Спаны вкладываются, вне трассы span ничего не делает."""
+
+        with span('outside') as record:
+            self.assertIsNone(record)
+
+        trace = _local.trace = Trace()
+        try:
+            with span('parent'):
+                with span('child'):
+                    pass
+                TracedFileSystemStorage(location=self.directory).save(
+                    'file.txt', ContentFile(b'data')
+                )
+        finally:
+            _local.trace = None
+
+        by_name = {record['name']: record for record in trace.spans}
+        parent_id = by_name['parent']['span_id']
+        self.assertIsNone(by_name['parent']['parent_id'])
+        self.assertEqual(by_name['child']['parent_id'], parent_id)
+        self.assertEqual(by_name['storage']['parent_id'], parent_id)
+        self.assertEqual(by_name['storage']['attributes']['operation'], 'save')
+
+
+class TracingMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'traces.jsonl')
+
+    def get(self, rate):
+        with override_settings(
+            TRACING_LOG=self.path, TRACING_SAMPLE_RATE=rate
+        ):
+            response = Client().get(reverse('posts:index'))
+        writer.flush()
+        return response
+
+    def read_spans(self):
+        with open(self.path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_request_is_traced(self):
+        """Трасса содержит view, шаблоны, include, SQL и кэш."""
+
+        response = self.get(rate=1)
+
+        spans = self.read_spans()
+        by_id = {record['span_id']: record for record in spans}
+        root = next(record for record in spans if record['name'] == 'request')
+        self.assertIsNone(root['parent_id'])
+        self.assertEqual(root['attributes']['view'], 'posts:index')
+        self.assertEqual(root['trace_id'], response['X-Trace-Id'])
+
+        names = {
+            (record['name'], record['attributes'].get('template'))
+            for record in spans
+        }
+        self.assertIn(('template', 'posts/index.html'), names)
+        self.assertIn(('template', 'includes/post_data.html'), names)
+        self.assertIn(('include', 'posts/includes/paginator.html'), names)
+        self.assertIn(('db', None), names)
+        self.assertIn(('cache', None), names)
+
+        card = next(
+            record for record in spans
+            if record['attributes'].get('template')
+            == 'includes/post_data.html'
+        )
+        self.assertEqual(
+            by_id[card['parent_id']]['attributes']['template'],
+            'posts/index.html',
+        )
+
+    def test_not_sampled(self):
+        """Запросы вне выборки не пишутся."""
+
+        response = self.get(rate=0)
+
+        self.assertNotIn('X-Trace-Id', response)
+        self.assertFalse(os.path.exists(self.path))
@@ -127,6 +127,17 @@ class PostURLTests(TestCase):
 
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
 
+    def test_unexisting_post_not_found(self):
+        """Запрос к несуществующему посту возвращает 404."""
+
+        for client in (self.test_client, self.user_client):
+            with self.subTest(client=client):
+                response = client.get(
+                    reverse(POST_DETAIL_URL, args=[PostURLTests.post.id + 1])
+                )
+
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
     def test_create_url_redirect_anonymous_on_admin_login(self):
         """Страница по адресу /create/ перенаправляет
         анонимного пользователя на страницу логина."""
@@ -0,0 +1,227 @@
+import logging
+import os
+from io import BytesIO
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps, features
+from sorl.thumbnail import default
+
+from core.tagged_cache import invalidate_tags, touch_tags
+
+from .utils import post_tags
+
+
+logger = logging.getLogger('yatube.thumbnails')
+
+# Размеры картинок в шаблонах: карточка в ленте и страница поста.
+GEOMETRIES = {
+    'card': (960, 600),
+    'detail': (960, 339),
+}
+# Ширины вариантов для srcset; высота пропорциональна.
+WIDTHS = (480, 960)
+SIZES = '(max-width: 960px) 100vw, 960px'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+# WebP есть не в каждой сборке Pillow; без него отдаётся только JPEG.
+FORMATS = ('JPEG', 'WEBP') if features.check('webp') else ('JPEG',)
+FALLBACK_FORMAT = 'JPEG'
+ORIENTATION_TAG = 0x0112
+
+Variant = namedtuple('Variant', 'geometry format width')
+Picture = namedtuple('Picture', 'src width height srcset sources sizes')
+
+_executor = None
+_executor_pid = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def get_placeholder_color(image):
+    """Средний цвет картинки PIL в виде #rrggbb."""
+    pixel = image.convert('RGB').resize((1, 1), Image.BOX).getpixel((0, 0))
+    return '#{:02x}{:02x}{:02x}'.format(*pixel)
+
+
+def prepare_upload(upload):
+    """Загруженная картинка, повёрнутая по EXIF, и цвет её заглушки.
+
+    Картинка перекодируется, только если в EXIF задан поворот; после
+    этого метаданные EXIF в ней не сохраняются.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        orientation = image.getexif().get(ORIENTATION_TAG, 1)
+        if orientation != 1:
+            format_ = image.format
+            image = ImageOps.exif_transpose(image)
+            buffer = BytesIO()
+            image.save(buffer, format=format_)
+            upload = SimpleUploadedFile(
+                upload.name, buffer.getvalue(), upload.content_type
+            )
+        color = get_placeholder_color(image)
+    upload.seek(0)
+    return upload, color
+
+
+def get_variants(size):
+    width, height = GEOMETRIES[size]
+    return [
+        Variant(
+            f'{variant}x{round(height * variant / width)}', format_, variant
+        )
+        for format_ in FORMATS for variant in WIDTHS
+    ]
+
+
+def get_options(variant):
+    options = dict(THUMBNAIL_OPTIONS, format=variant.format)
+    if variant.format == 'JPEG':
+        options['progressive'] = True
+    return options
+
+
+def get_cached(names, variants):
+    """Готовые варианты картинок: {(имя, вариант): миниатюра}."""
+    requests = [
+        (name, variant) for name in names for variant in variants
+    ]
+    found = default.backend.get_cached_thumbnails([
+        (name, variant.geometry, get_options(variant))
+        for name, variant in requests
+    ]) if requests else []
+    return {
+        request: thumbnail
+        for request, thumbnail in zip(requests, found)
+        if thumbnail is not None
+    }
+
+
+def build_picture(name, variants, cached):
+    """Picture для шаблона или None, пока нет основного JPEG."""
+    by_format = {}
+    for variant in variants:
+        thumbnail = cached.get((name, variant))
+        if thumbnail is not None:
+            by_format.setdefault(variant.format, []).append(
+                (variant.width, thumbnail)
+            )
+    fallback = by_format.pop(FALLBACK_FORMAT, None)
+    if not fallback or fallback[-1][0] != WIDTHS[-1]:
+        return None
+
+    def srcset(thumbnails):
+        return ', '.join(
+            f'{thumbnail.url} {width}w' for width, thumbnail in thumbnails
+        )
+
+    src = fallback[-1][1]
+    return Picture(
+        src=src.url,
+        width=src.width,
+        height=src.height,
+        srcset=srcset(fallback),
+        sources=[
+            (f'image/{format_.lower()}', srcset(thumbnails))
+            for format_, thumbnails in by_format.items()
+        ],
+        sizes=SIZES,
+    )
+
+
+def get_ready_thumbnails(images, size):
+    """Готовые Picture для списка картинок за одно обращение
+    к хранилищу ключей; None там, где картинки или миниатюр нет."""
+    variants = get_variants(size)
+    names = list(dict.fromkeys(image.name for image in images if image))
+    cached = get_cached(names, variants)
+    return [
+        build_picture(image.name, variants, cached) if image else None
+        for image in images
+    ]
+
+
+def get_ready_thumbnail(image, size):
+    """Готовая Picture картинки или None, если миниатюр ещё нет."""
+    return get_ready_thumbnails([image], size)[0]
+
+
+def generate_thumbnails(name):
+    """Создаёт недостающие варианты картинки; возвращает их число."""
+    variants = [
+        variant for size in GEOMETRIES for variant in get_variants(size)
+    ]
+    cached = get_cached([name], variants)
+    created = 0
+    for variant in variants:
+        if (name, variant) not in cached:
+            default.backend.get_thumbnail(
+                name, variant.geometry, **get_options(variant)
+            )
+            created += 1
+    return created
+
+
+def run_job(name, tags):
+    try:
+        if generate_thumbnails(name):
+            # Страницы с заглушкой вместо картинки уже могли попасть
+            # в кэш.
+            invalidate_tags(*tags)
+            touch_tags('feed:index')
+    except Exception:
+        logger.exception('Не удалось создать миниатюры %s', name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+
+
+def run_in_worker(name, tags):
+    try:
+        run_job(name, tags)
+    finally:
+        connections.close_all()
+
+
+def get_executor():
+    global _executor, _executor_pid
+    # После fork потоки пула родителя в дочернем процессе не работают,
+    # а его задачи не выполнятся.
+    if _executor is None or _executor_pid != os.getpid():
+        _pending.clear()
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def submit(name, tags):
+    with _lock:
+        executor = get_executor() if settings.THUMBNAIL_WORKERS else None
+        if name in _pending:
+            return
+        _pending.add(name)
+    if executor is None:
+        run_job(name, tags)
+    else:
+        executor.submit(run_in_worker, name, tags)
+
+
+def schedule_thumbnails(post):
+    """Ставит в очередь миниатюры картинки поста после коммита.
+
+    При THUMBNAIL_WORKERS = 0 они создаются сразу после коммита
+    в том же потоке.
+    """
+    if not post.image:
+        return
+    name = post.image.name
+    tags = post_tags(post)
+    transaction.on_commit(lambda: submit(name, tags))
@@ -1,11 +1,215 @@
-from django.core.paginator import Paginator
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.paginator import Paginator, Page
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+
+from core.tagged_cache import add_cache_tags, cached_by_tags
+
+from .counters import get_stats
+from .models import Comment, Post
 
 
 SORT_POST = 10
+SORT_COMMENT = 20
+OFFSET_PAGES_LIMIT = 5
+CURSOR_SALT = 'posts.utils.cursor'
+USER_ID_KEY = 'user_id:{}'
+GROUP_ID_KEY = 'group_id:{}'
+POST_TAGS_KEY = 'post_tags:{}'
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+def post_tags(post):
+    tags = [f'post:{post.pk}', f'author:{post.author_id}']
+    if post.group_id:
+        tags.append(f'group:{post.group_id}')
+    return tags
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу сортировки без COUNT(*) и OFFSET.
+
+    Страницы после первых OFFSET_PAGES_LIMIT доступны только
+    по непрозрачным курсорам next_cursor и previous_cursor.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-pk')):
+        self.ordering = ordering
+        super().__init__(object_list.order_by(*ordering), per_page)
+        self.num_pages = 1
+
+    def get_page(self, number=None, cursor=None):
+        if cursor:
+            try:
+                data = signing.loads(cursor, salt=CURSOR_SALT)
+                return self.cursor_page(data)
+            except (signing.BadSignature, KeyError, TypeError, ValueError):
+                pass
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        if not 1 <= number <= OFFSET_PAGES_LIMIT:
+            number = 1
+        return self.page(number)
+
+    def page(self, number):
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return self.build_page(rows[:self.per_page], number, has_next)
+
+    def cursor_page(self, data):
+        values = [
+            self.get_field(name).to_python(value)
+            for name, value in zip(self.field_names(), data['v'])
+        ]
+        number = int(data['n'])
+
+        if data['d'] == FORWARD:
+            queryset = self.object_list.filter(self.keyset_filter(values))
+            rows = list(queryset[:self.per_page + 1])
+            return self.build_page(
+                rows[:self.per_page], number, len(rows) > self.per_page
+            )
+
+        queryset = self.object_list.filter(
+            self.keyset_filter(values, reverse=True)
+        ).reverse()
+        rows = list(queryset[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return self.build_page(rows, max(number, 2) if has_previous else 1)
+
+    def build_page(self, rows, number, has_next=True):
+        self.num_pages = number + 1 if has_next else number
+        page = Page(rows, number, self)
+        page.next_cursor = None
+        page.previous_cursor = None
+        if rows and has_next:
+            page.next_cursor = self.make_cursor(rows[-1], FORWARD, number + 1)
+        if rows and number > 1:
+            page.previous_cursor = self.make_cursor(
+                rows[0], BACKWARD, number - 1
+            )
+        return page
+
+    def make_cursor(self, obj, direction, number):
+        values = [
+            self.get_field(name).value_to_string(obj)
+            for name in self.field_names()
+        ]
+        return signing.dumps(
+            {'v': values, 'd': direction, 'n': number}, salt=CURSOR_SALT
+        )
+
+    def field_names(self):
+        return [name.lstrip('-') for name in self.ordering]
+
+    def get_field(self, name):
+        opts = self.object_list.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def keyset_filter(self, values, reverse=False):
+        """Условие «строго после значений values» в порядке ordering.
+
+        Нестрогая граница по первому полю позволяет базе читать индекс
+        диапазоном, а не объединять несколько поисков.
+        """
+        condition = Q()
+        equal = {}
+        for name, value in zip(self.ordering, values):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') != reverse else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+
+        first = self.ordering[0]
+        lookup = 'lte' if first.startswith('-') != reverse else 'gte'
+        bound = Q(**{f'{first.lstrip("-")}__{lookup}': values[0]})
+        return bound & condition
 
 
-def get_page(queryset, request):
-    paginator = Paginator(queryset, SORT_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def get_page(queryset, request, ordering=('-pub_date', '-pk')):
+    paginator = CursorPaginator(queryset, SORT_POST, ordering)
+    page_obj = paginator.get_page(
+        request.GET.get('page'), request.GET.get('cursor')
+    )
     return page_obj
+
+
+def tag_posts(request, posts):
+    """Помечает страницу постами и их авторами: имя автора есть
+    в каждой карточке."""
+    for post in posts:
+        add_cache_tags(request, f'post:{post.pk}', f'user:{post.author_id}')
+
+
+def get_comments_page(post_id, cursor=None):
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        SORT_COMMENT,
+        ordering=('-created', '-pk'),
+    )
+    return paginator.get_page(cursor=cursor)
+
+
+def get_post_bundle(post_id):
+    """Возвращает пост со счётчиком постов автора и комментариями.
+
+    Набор кэшируется до правки поста, его группы, нового комментария
+    или поста автора.
+    """
+    def build():
+        post = get_object_or_404(
+            Post.objects.select_related('author__stats', 'group'),
+            pk=post_id,
+        )
+        comments = get_comments_page(post.pk)
+        bundle = {
+            'post': post,
+            'posts_count': get_stats(post.author).posts_count,
+            'comments': list(comments),
+            'comments_next_cursor': comments.next_cursor,
+        }
+        return bundle, post_tags(post)
+
+    return cached_by_tags(
+        f'post_bundle:{post_id}', build, settings.PAGE_CACHE_TIMEOUT
+    )
+
+
+def remember_user_id(username, user_id):
+    cache.set(USER_ID_KEY.format(username), user_id, None)
+
+
+def profile_scopes(request, username):
+    """Теги профиля для conditional_page. Пока view не запомнил id
+    автора, страница отдаётся без проверки, чтобы не тратить запрос."""
+    user_id = cache.get(USER_ID_KEY.format(username))
+    return [f'author:{user_id}'] if user_id else None
+
+
+def remember_group_id(slug, group_id):
+    cache.set(GROUP_ID_KEY.format(slug), group_id, None)
+
+
+def group_scopes(request, slug):
+    """Теги группы для conditional_page; как и у профиля, без запроса
+    к базе, пока view не запомнил id группы."""
+    group_id = cache.get(GROUP_ID_KEY.format(slug))
+    return [f'group:{group_id}'] if group_id else None
+
+
+def remember_post_tags(post):
+    # Смена группы меняет тег поста, и view запомнит новые теги при
+    # следующем рендере, поэтому они хранятся бессрочно.
+    cache.set(POST_TAGS_KEY.format(post.pk), post_tags(post), None)
+
+
+def post_scopes(request, post_id):
+    return cache.get(POST_TAGS_KEY.format(post_id))
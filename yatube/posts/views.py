@@ -1,23 +1,46 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
 
-from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Follow
-from .utils import get_page
-
-
-@cache_page(20, key_prefix='index_page')
+from core.conditional import conditional_page
+from core.tagged_cache import add_cache_tags, tagged_cache_page
+
+from .counters import get_stats
+from .forms import PostForm, CommentForm, SearchForm
+from .models import FeedEntry, Post, Group, User, Follow
+from .search import SEARCH_CANDIDATES, search_posts
+from .thumbnails import get_ready_thumbnail
+from .utils import (
+    SORT_POST, get_comments_page, get_page, get_post_bundle, group_scopes,
+    post_scopes, profile_scopes, remember_group_id, remember_post_tags,
+    remember_user_id, tag_posts,
+)
+
+
+@conditional_page('feed:index')
+@tagged_cache_page(
+    settings.PAGE_CACHE_TIMEOUT,
+    key_prefix='index_page',
+    tags=('feed:index',)
+)
 def index(request):
-    page_obj = get_page(Post.objects.all(), request)
+    page_obj = get_page(Post.objects.for_feed(), request)
+    tag_posts(request, page_obj)
 
     return render(request, 'posts/index.html', context={'page_obj': page_obj})
 
 
+@conditional_page(group_scopes)
+@tagged_cache_page(settings.PAGE_CACHE_TIMEOUT, key_prefix='group_page')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    # Тег по id: после смены slug страница по старому адресу тоже
+    # сбрасывается.
+    add_cache_tags(request, f'group:{group.pk}')
+    remember_group_id(slug, group.pk)
+    posts = group.posts.for_feed()
     page_obj = get_page(posts, request)
+    tag_posts(request, page_obj)
 
     return render(
         request, 'posts/group_list.html', context={
@@ -26,16 +49,18 @@ def group_posts(request, slug):
     )
 
 
+@conditional_page(profile_scopes)
+@tagged_cache_page(settings.PAGE_CACHE_TIMEOUT, key_prefix='profile_page')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-
-    posts_list = author.posts.all()
-    posts_count = posts_list.count()
-
-    page_obj = get_page(posts_list, request)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    add_cache_tags(request, f'author:{author.pk}')
+    remember_user_id(username, author.pk)
+    stats = get_stats(author)
 
-    followers_count = Follow.objects.filter(author=author).count()
-    following_count = Follow.objects.filter(user=author).count()
+    page_obj = get_page(author.posts.for_feed(), request)
+    tag_posts(request, page_obj)
 
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=author
@@ -44,36 +69,78 @@ def profile(request, username):
     context = {
         'author': author,
         'page_obj': page_obj,
-        'posts_count': posts_count,
+        'posts_count': stats.posts_count,
         'following': following,
-        'followers_count': followers_count,
-        'following_count': following_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
     }
 
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(post_scopes)
+@tagged_cache_page(
+    settings.PAGE_CACHE_TIMEOUT,
+    key_prefix='post_page',
+    tags=('post:{post_id}',)
+)
 def post_detail(request, post_id):
-    post = Post.objects.get(pk=post_id)
+    bundle = get_post_bundle(post_id)
+    post = bundle['post']
+    add_cache_tags(request, f'author:{post.author_id}')
+    remember_post_tags(post)
+    if post.group_id:
+        add_cache_tags(request, f'group:{post.group_id}')
 
-    username = post.author.get_username()
-    author = get_object_or_404(User, username=username)
-
-    posts_list = author.posts.all()
-    posts_count = posts_list.count()
+    picture = get_ready_thumbnail(post.image, 'detail')
 
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
 
     context = {
-        'posts_count': posts_count,
+        'posts_count': bundle['posts_count'],
         'post': post,
+        'picture': picture,
         'form': form,
-        'comments': comments,
+        'comments': bundle['comments'],
+        'next_cursor': bundle['comments_next_cursor'],
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    comments = get_comments_page(post_id, request.GET.get('cursor'))
+
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+        'next_cursor': comments.next_cursor,
+    }
+    return render(request, 'includes/comments_list.html', context)
+
+
+def search(request):
+    form = SearchForm(request.GET or None)
+    page = None
+    if form.is_valid():
+        page = search_posts(
+            form.cleaned_data['q'],
+            SORT_POST,
+            author_id=form.cleaned_data['author'],
+            group_id=form.cleaned_data['group'],
+            cursor=request.GET.get('cursor'),
+        )
+
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    context = {
+        'form': form,
+        'page': page,
+        'query_string': params.urlencode(),
+        'search_window': SEARCH_CANDIDATES,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -98,7 +165,7 @@ def post_create(request):
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
 
-    if post.author != request.user:
+    if post.author_id != request.user.pk:
         return redirect('posts:post_detail', post.pk)
 
     form = PostForm(
@@ -135,8 +202,9 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page(posts_list, request)
+    entries = FeedEntry.objects.filter(user=request.user).for_feed()
+    page_obj = get_page(entries, request, ordering=('-pub_date', '-post_id'))
+    page_obj.object_list = [entry.post for entry in page_obj]
 
     return render(request, 'posts/follow.html', context={'page_obj': page_obj})
 
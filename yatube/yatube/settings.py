@@ -52,10 +52,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.tracing.TracingMiddleware',
+    'core.metrics.MetricsMiddleware',
+    'core.server_timing.ServerTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -65,7 +69,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -143,8 +147,116 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+
+# Миниатюры sorl-thumbnail сами выбирают имена файлов.
+THUMBNAIL_STORAGE = 'core.storage.TracedFileSystemStorage'
+
+CACHE_BACKENDS = {
+    # Свой кэш у каждого процесса.
+    'locmem': {
+        'BACKEND': 'core.cache_backends.InstrumentedLocMemCache',
+    },
+    # Общий кэш всех процессов сервера в файле SQLite.
+    'sqlite': {
+        'BACKEND': 'core.cache_backends.InstrumentedSQLiteCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
+    },
+}
+
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    'default': CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem')],
+}
+
+FEED_MAX_LENGTH = 1000
+
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+L1_CACHE_SIZE = 1000
+
+L1_CACHE_TIMEOUT = 5
+
+STALE_CACHE_TIMEOUT = 60 * 60
+
+CACHE_LOCK_TIMEOUT = 30
+
+CACHE_LOCK_WAIT = 5
+
+CACHE_EARLY_REFRESH_BETA = 1.0
+
+# Меняется при выкладке, чтобы ETag старых страниц перестали совпадать.
+ETAG_VERSION = os.getenv('ETAG_VERSION', '')
+
+THUMBNAIL_BACKEND = 'core.thumbnail_backends.TimedThumbnailBackend'
+
+THUMBNAIL_KVSTORE = 'core.thumbnail_backends.BatchedKVStore'
+
+# Потоки, создающие миниатюры после сохранения поста; 0 -- сразу
+# после коммита в потоке запроса.
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 2))
+
+SERVER_TIMING = bool(os.getenv('SERVER_TIMING'))
+
+SERVER_TIMING_LOG = bool(os.getenv('SERVER_TIMING_LOG'))
+
+METRICS_DIR = os.getenv('METRICS_DIR')
+
+METRICS_FLUSH_INTERVAL = 5
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG')
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100))
+
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+
+SLOW_QUERY_LOG_BACKUPS = 5
+
+PROFILER_DIR = os.getenv('PROFILER_DIR')
+
+PROFILER_SAMPLE_RATE = int(os.getenv('PROFILER_SAMPLE_RATE', 0))
+
+PROFILER_INTERVAL = 0.005
+
+PROFILER_SIGNATURE_MAX_AGE = 60 * 60
+
+TRACING_LOG = os.getenv('TRACING_LOG')
+
+TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', 0.01))
+
+TRACING_QUEUE_SIZE = 1000
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'yatube.server_timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'yatube.cache': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'yatube.thumbnails': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
 }